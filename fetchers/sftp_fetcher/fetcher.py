@@ -15,6 +15,11 @@ from fetchers.shared.state import FetcherState
 
 logger = logging.getLogger(__name__)
 
+# SSH channel window for the SFTP session. paramiko's 2 MB default stalls
+# downloads on high-latency links while the server waits for window
+# adjustments; a large window lets the server stream whole files.
+SFTP_WINDOW_SIZE = 2**27
+
 
 class SFTPFetcher:
     """Polls an external SFTP server and downloads new files."""
@@ -85,7 +90,9 @@ class SFTPFetcher:
             self.transport.connect(username=self.username, password=self.password)
             logger.info("Authenticated with password")
         
-        self.sftp = paramiko.SFTPClient.from_transport(self.transport)
+        self.sftp = paramiko.SFTPClient.from_transport(
+            self.transport, window_size=SFTP_WINDOW_SIZE
+        )
         logger.info(f"SFTP connection established")
 
     def disconnect(self) -> None:
@@ -132,6 +139,9 @@ class SFTPFetcher:
         logger.info(f"Downloading {remote_filepath}")
         
         with self.sftp.open(remote_filepath, 'rb') as remote_file:
+            # Queue reads for the whole file up front instead of one
+            # 32 KB request per round trip.
+            remote_file.prefetch()
             return remote_file.read()
 
     def delete_remote_file(self, filename: str) -> None:
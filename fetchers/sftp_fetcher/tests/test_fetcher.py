@@ -5,7 +5,7 @@ import pytest
 from pathlib import Path
 from unittest.mock import patch, MagicMock, Mock
 
-from fetchers.sftp_fetcher.fetcher import SFTPFetcher
+from fetchers.sftp_fetcher.fetcher import SFTP_WINDOW_SIZE, SFTPFetcher
 
 
 class TestSFTPFetcherInit:
@@ -90,6 +90,9 @@ class TestConnectDisconnect:
         
         patched_paramiko['transport_class'].assert_called_once_with(("sftp.example.com", 22))
         patched_paramiko['rsa_key'].from_private_key_file.assert_called_once_with("/path/to/key")
+        patched_paramiko['sftp_client_class'].from_transport.assert_called_once_with(
+            patched_paramiko['transport'], window_size=SFTP_WINDOW_SIZE
+        )
         assert fetcher.sftp is not None
     
     def test_connect_with_password(self, base_config, tmp_dirs, monkeypatch, patched_paramiko):
@@ -212,6 +215,7 @@ class TestFileOperations:
         content = fetcher.download_file("test.csv")
         
         patched_paramiko['sftp'].open.assert_called_once_with("/outgoing/cml/test.csv", 'rb')
+        patched_paramiko['sftp'].open.return_value.prefetch.assert_called_once_with()
         assert content == b"test,content\n1,2,3"
     
     def test_delete_remote_file(self, base_config, tmp_dirs, monkeypatch, patched_paramiko):
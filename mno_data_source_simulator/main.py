@@ -80,6 +80,8 @@ def main():
         config["sftp"]["private_key_path"] = os.getenv("SFTP_PRIVATE_KEY_PATH")
     if os.getenv("SFTP_KNOWN_HOSTS_PATH"):
         config["sftp"]["known_hosts_path"] = os.getenv("SFTP_KNOWN_HOSTS_PATH")
+    if os.getenv("SFTP_COMPRESSION"):
+        config["sftp"]["compression"] = os.getenv("SFTP_COMPRESSION")
     # SFTP_USE_SSH_KEY=false removes any private_key_path set in config.yml
     if os.getenv("SFTP_USE_SSH_KEY", "").lower() == "false":
         config["sftp"].pop("private_key_path", None)
@@ -124,6 +126,7 @@ def main():
                     remote_path=config["sftp"]["remote_path"],
                     source_dir=config["file_management"]["source_dir"],
                     connection_timeout=config["sftp"].get("connection_timeout", 30),
+                    compression=config["sftp"].get("compression"),
                 )
                 sftp_uploader.connect()
                 logger.info("SFTP uploader initialized")
@@ -9,6 +9,7 @@ import io
 import logging
 import re
 import os
+import shutil
 from datetime import datetime
 from typing import Optional, List
 from pathlib import Path
@@ -32,6 +33,7 @@ class SFTPUploader:
         source_dir: str = "data_to_upload",
         connection_timeout: int = 30,
         max_files_per_call: int = 200,
+        compression: Optional[str] = None,
     ):
         """
         Initialize the SFTP uploader.
@@ -57,6 +59,10 @@ class SFTPUploader:
             Local directory to read files from (default: "data_to_upload").
         connection_timeout : int, optional
             Connection timeout in seconds (default: 30).
+        compression : str, optional
+            Stream compression applied to uploaded files. ``"zstd"`` uploads
+            ``<filename>.zst`` compressed on the fly with zstandard; the
+            parser decompresses it transparently. Default: no compression.
         """
         self.host = host
         self.port = port
@@ -71,6 +77,10 @@ class SFTPUploader:
         # worst-case paramiko buffer allocation if failures slip through.
         self.max_files_per_call = max_files_per_call
 
+        if compression not in (None, "zstd"):
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.compression = compression
+
         # Validate remote path
         self.remote_path = self._validate_remote_path(remote_path)
 
@@ -364,8 +374,13 @@ class SFTPUploader:
         remote_file_path = f"{self.remote_path}/{safe_filename}"
 
         try:
-            logger.info(f"Uploading file: {safe_filename}")
-            self.sftp.put(local_path, remote_file_path)
+            if self.compression == "zstd":
+                remote_file_path += ".zst"
+                logger.info(f"Uploading file (zstd): {safe_filename}.zst")
+                self._put_zstd(local_path, remote_file_path)
+            else:
+                logger.info(f"Uploading file: {safe_filename}")
+                self.sftp.put(local_path, remote_file_path)
             logger.info(f"Successfully uploaded file")
             return remote_file_path
 
@@ -382,6 +397,18 @@ class SFTPUploader:
             logger.error(f"Unexpected error during upload: {e}")
             raise
 
+    def _put_zstd(self, local_path: str, remote_file_path: str):
+        """Stream *local_path* through a zstd compressor into the remote file."""
+        import zstandard
+
+        with open(local_path, "rb") as local_fh, self.sftp.open(
+            remote_file_path, "wb"
+        ) as remote_fh:
+            with zstandard.ZstdCompressor().stream_writer(
+                remote_fh, closefd=False
+            ) as writer:
+                shutil.copyfileobj(local_fh, writer)
+
     def get_pending_files(self) -> List[Path]:
         """
         Get list of CSV files waiting to be uploaded.
@@ -391,7 +418,14 @@ class SFTPUploader:
         List[Path]
             List of CSV file paths in the source directory.
         """
-        csv_files = sorted(self.source_dir.glob("*.csv"))
+        # One readdir pass; DirEntry carries the file type, so no per-file
+        # stat call is needed to skip directories.
+        with os.scandir(self.source_dir) as it:
+            csv_files = sorted(
+                Path(entry.path)
+                for entry in it
+                if entry.name.endswith(".csv") and entry.is_file()
+            )
         logger.debug(f"Found {len(csv_files)} pending files")
         return csv_files
 
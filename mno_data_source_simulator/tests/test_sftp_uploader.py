@@ -676,3 +676,54 @@ def test_remote_directory_creation(test_dirs, mock_sftp):
     assert mock_sftp["sftp"].mkdir.call_count > 0
 
     uploader.close()
+
+
+def test_upload_file_zstd_compression(test_dirs, sample_csv_files, mock_sftp):
+    """With compression='zstd' the file is streamed compressed to <name>.zst."""
+    import io
+    import zstandard
+
+    uploader = SFTPUploader(
+        host="localhost",
+        port=22,
+        username="test_user",
+        password="test_pass",
+        remote_path="/upload",
+        source_dir=test_dirs["source"],
+        compression="zstd",
+    )
+    uploader.connect()
+
+    remote_buf = io.BytesIO()
+    remote_fh = MagicMock()
+    remote_fh.__enter__ = Mock(return_value=remote_fh)
+    remote_fh.__exit__ = Mock(return_value=False)
+    remote_fh.write.side_effect = remote_buf.write
+    mock_sftp["sftp"].open.return_value = remote_fh
+
+    local_file = sample_csv_files[0]
+    remote_path = uploader.upload_file(local_file)
+
+    assert remote_path == "/upload/" + Path(local_file).name + ".zst"
+    mock_sftp["sftp"].put.assert_not_called()
+    mock_sftp["sftp"].open.assert_called_once_with(remote_path, "wb")
+    decompressed = (
+        zstandard.ZstdDecompressor()
+        .stream_reader(io.BytesIO(remote_buf.getvalue()))
+        .read()
+    )
+    assert decompressed == Path(local_file).read_bytes()
+
+    uploader.close()
+
+
+def test_unsupported_compression_rejected(test_dirs):
+    with pytest.raises(ValueError, match="Unsupported compression"):
+        SFTPUploader(
+            host="localhost",
+            port=22,
+            username="test_user",
+            password="test_pass",
+            source_dir=test_dirs["source"],
+            compression="gzip",
+        )
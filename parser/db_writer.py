@@ -1,24 +1,76 @@
 """Database writer utilities for the parser service.
 
 Provides a DBWriter class that handles connections and writes for
-`cml_metadata` and `cml_data` tables. Uses psycopg2 and
-psycopg2.extras.execute_values for batch inserts.
+`cml_metadata` and `cml_data` tables. Uses psycopg2 and bulk-loads rows
+with `COPY ... FROM STDIN` into a temporary staging table, which is then
+merged into the target table with a single `INSERT ... SELECT`. Raw
+data is sent in PostgreSQL's binary COPY format (see `pg_binary_copy`).
 
 This module is intentionally minimal and logs errors rather than
 exiting the process so the caller can decide how to handle failures.
 """
 
-from typing import List, Tuple, Optional, Set, Callable, TypeVar
+from typing import List, Tuple, Optional, Sequence, Set, Callable, TypeVar, Union
+import io
 import time
 import functools
+import numpy as np
+import pandas as pd
 import psycopg2
-import psycopg2.extras
 import logging
 
+from .pg_binary_copy import encode_columns, encode_dataframe
+
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
+# psycopg2 defaults to 8 KiB chunks for copy_expert.
+DEFAULT_COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def _as_text(series):
+    """Return `series` as strings, skipping the cast if it already is one."""
+    if pd.api.types.is_string_dtype(series):
+        return series
+    return series.astype(str)
+
+
+def _column_values(df, name: str) -> np.ndarray:
+    """Return column `name` of `df`, falling back to the index level."""
+    if name in df.columns:
+        return df[name].values
+    return df.index.get_level_values(name).values
+
+
+# libpq TCP keepalive settings: probe after 30s idle, every 10s, give up
+# after 3 missed probes.
+KEEPALIVE_KWARGS = {
+    "keepalives": 1,
+    "keepalives_idle": 30,
+    "keepalives_interval": 10,
+    "keepalives_count": 3,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _copy_merge_sql(
+    table: str, columns: Tuple[str, ...], copy_format: str, conflict_sql: str
+) -> Tuple[str, str, str]:
+    """Return the (create stage, COPY, merge) statements for a target table."""
+    stage = f"_stage_{table}"
+    col_list = ", ".join(columns)
+    return (
+        f"CREATE TEMP TABLE IF NOT EXISTS {stage} "
+        f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS",
+        f"COPY {stage} ({col_list}) FROM STDIN WITH (FORMAT {copy_format})",
+        f"INSERT INTO {table} ({col_list}) SELECT {col_list} FROM {stage} {conflict_sql}",
+    )
+
+
+# Column order of the binary COPY payload built by write_rawdata_arrays.
+RAWDATA_COLUMNS = ("time", "cml_id", "sublink_id", "rsl", "tsl", "user_id")
+
 
 class DBWriter:
     """Simple database writer helper.
@@ -31,25 +83,98 @@ class DBWriter:
         db.close()
     """
 
+    _METADATA_COLUMNS = (
+        "cml_id",
+        "sublink_id",
+        "site_0_lon",
+        "site_0_lat",
+        "site_1_lon",
+        "site_1_lat",
+        "frequency",
+        "polarization",
+        "length",
+    )
+    # Binary COPY types, in COPY order; REAL columns go as float4.
+    _METADATA_TYPES = {
+        "cml_id": "text",
+        "sublink_id": "text",
+        "site_0_lon": "float4",
+        "site_0_lat": "float4",
+        "site_1_lon": "float4",
+        "site_1_lat": "float4",
+        "frequency": "float4",
+        "polarization": "text",
+        "length": "float4",
+        "user_id": "text",
+    }
+    _METADATA_CONFLICT_SQL = (
+        "ON CONFLICT (cml_id, sublink_id, user_id) DO UPDATE SET "
+        "site_0_lon = EXCLUDED.site_0_lon, "
+        "site_0_lat = EXCLUDED.site_0_lat, "
+        "site_1_lon = EXCLUDED.site_1_lon, "
+        "site_1_lat = EXCLUDED.site_1_lat, "
+        "frequency = EXCLUDED.frequency, "
+        "polarization = EXCLUDED.polarization, "
+        "length = EXCLUDED.length"
+    )
+    _RAWDATA_CONFLICT_SQL = "ON CONFLICT (time, cml_id, sublink_id, user_id) DO NOTHING"
+
     def __init__(
-        self, db_url: str, user_id: str = "demo_openmrg", connect_timeout: int = 10
+        self,
+        db_url: str,
+        user_id: str = "demo_openmrg",
+        connect_timeout: int = 10,
+        copy_buffer_size: int = DEFAULT_COPY_BUFFER_SIZE,
+        synchronous_commit: Optional[str] = None,
     ):
         self.db_url = db_url
         self.user_id = user_id
         self.connect_timeout = connect_timeout
+        # Bytes sent per CopyData message. Larger chunks mean fewer
+        # round trips per file at the cost of a bigger client buffer.
+        self.copy_buffer_size = copy_buffer_size
+        # Session synchronous_commit setting, e.g. "off" to skip waiting for
+        # the WAL flush on every commit. None keeps the server default.
+        self.synchronous_commit = synchronous_commit
         self.conn: Optional[psycopg2.extensions.connection] = None
+        # (cml_id, sublink_id) pairs known to exist in cml_metadata; grown by
+        # validation lookups and write_metadata, dropped on reconnect.
+        self._metadata_ids_cache: Optional[Set[Tuple[str, str]]] = None
+        self._cursor: Optional[psycopg2.extensions.cursor] = None
+        # Staging tables already created (and committed) on this connection.
+        self._staged_tables: Set[str] = set()
 
         # Retry configuration
         self.max_retries = 3
         self.retry_backoff_seconds = 2
 
     def _attempt_connect(self) -> psycopg2.extensions.connection:
-        """Attempt a single database connection."""
-        return psycopg2.connect(self.db_url, connect_timeout=self.connect_timeout)
+        """Attempt a single database connection.
+
+        TCP keepalives let the client notice a dead peer (DB restart, NAT
+        timeout) while idle, instead of on the next write. Session settings
+        go in the startup packet so they survive reconnects without an
+        extra round trip.
+        """
+        kwargs = dict(KEEPALIVE_KWARGS)
+        if self.synchronous_commit:
+            kwargs["options"] = f"-c synchronous_commit={self.synchronous_commit}"
+        return psycopg2.connect(
+            self.db_url, connect_timeout=self.connect_timeout, **kwargs
+        )
 
     def connect(self) -> None:
-        if self.conn:
+        """Open a connection unless a live one is already held.
+
+        Cheap to call before every operation: it only reconnects when the
+        previous connection was closed (e.g. by a server restart).
+        """
+        if self.is_connected():
             return
+        if self.conn is not None:
+            logger.warning("Database connection was closed, reconnecting")
+            self.conn = None
+            self._metadata_ids_cache = None
 
         logger.debug("Connecting to database with retries")
         last_exc = None
@@ -74,6 +199,43 @@ class DBWriter:
         logger.exception("All database connection attempts failed")
         raise last_exc
 
+    def wait_for_db(
+        self,
+        timeout: float = 30.0,
+        initial_delay: float = 0.1,
+        max_delay: float = 5.0,
+    ) -> bool:
+        """Poll the database until a connection succeeds or `timeout` passes.
+
+        Meant for startup, when the database container may still be coming
+        up: single attempts with a short, exponentially growing pause return
+        as soon as the server accepts connections instead of sleeping a
+        fixed interval.
+
+        Returns:
+            True once connected, False if `timeout` seconds elapsed first
+        """
+        if self.is_connected():
+            return True
+        self.conn = None
+        self._metadata_ids_cache = None
+
+        deadline = time.monotonic() + timeout
+        delay = initial_delay
+        while True:
+            try:
+                self.conn = self._attempt_connect()
+                logger.debug("Database connection established")
+                return True
+            except psycopg2.OperationalError as e:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.error("Database not reachable after %.0fs: %s", timeout, e)
+                    return False
+                logger.debug("Database not ready, retrying in %.1fs: %s", delay, e)
+                time.sleep(min(delay, remaining))
+                delay = min(delay * 2, max_delay)
+
     def is_connected(self) -> bool:
         if self.conn is None:
             return False
@@ -95,9 +257,15 @@ class DBWriter:
             except Exception:
                 logger.exception("Error closing DB connection")
         self.conn = None
+        self._cursor = None
+        self._metadata_ids_cache = None
 
     def get_existing_metadata_ids(self) -> Set[Tuple[str, str]]:
-        """Return set of (cml_id, sublink_id) tuples present in cml_metadata."""
+        """Return set of (cml_id, sublink_id) tuples present in cml_metadata.
+
+        Always queries the database (the cache may hold only the pairs seen
+        so far) and seeds the cache with the result.
+        """
         if not self.is_connected():
             raise RuntimeError("Not connected to database")
 
@@ -108,28 +276,67 @@ class DBWriter:
                 (self.user_id,),
             )
             rows = cur.fetchall()
-            return {(str(r[0]), str(r[1])) for r in rows}
+            self._metadata_ids_cache = {(str(r[0]), str(r[1])) for r in rows}
+            return set(self._metadata_ids_cache)
+        finally:
+            cur.close()
+
+    def _lookup_metadata_ids(self, pairs: Set[Tuple[str, str]]) -> Set[Tuple[str, str]]:
+        """Return the subset of `pairs` present in cml_metadata.
+
+        One round trip: the pairs are sent as two text arrays and matched
+        server-side against the primary key index.
+        """
+        cml_ids, sublink_ids = zip(*pairs)
+        cur = self.conn.cursor()
+        try:
+            cur.execute(
+                "SELECT cml_id, sublink_id FROM cml_metadata "
+                "WHERE user_id = %s AND (cml_id, sublink_id) IN "
+                "(SELECT * FROM unnest(%s::text[], %s::text[]))",
+                (self.user_id, list(cml_ids), list(sublink_ids)),
+            )
+            return {(str(r[0]), str(r[1])) for r in cur.fetchall()}
         finally:
             cur.close()
 
     def validate_rawdata_references(self, df) -> Tuple[bool, List[Tuple[str, str]]]:
         """Check that all (cml_id, sublink_id) pairs in df exist in cml_metadata.
 
+        Pairs already known to exist are answered from the cache; only the
+        rest are looked up, and those found are added to the cache.
+
         Returns (True, []) if all present, otherwise (False, missing_pairs).
+        `missing_pairs` is in no particular order.
         """
         if df is None or df.empty:
             return True, []
+        if not self.is_connected():
+            raise RuntimeError("Not connected to database")
 
-        cml_pairs = set(zip(df["cml_id"].astype(str), df["sublink_id"].astype(str)))
-        existing = self.get_existing_metadata_ids()
-        missing = sorted(list(cml_pairs - existing))
-        return (len(missing) == 0, missing)
+        # Deduplicate in pandas first: a batch holds few distinct pairs, and
+        # building a Python tuple per row dominated this check.
+        pairs = df[["cml_id", "sublink_id"]].drop_duplicates()
+        cml_pairs = frozenset(
+            zip(_as_text(pairs["cml_id"]), _as_text(pairs["sublink_id"]))
+        )
+        unknown = cml_pairs.difference(self._metadata_ids_cache or ())
+        if not unknown:
+            return True, []
+
+        found = self._lookup_metadata_ids(unknown)
+        if self._metadata_ids_cache is None:
+            self._metadata_ids_cache = set()
+        self._metadata_ids_cache.update(found)
+        missing = unknown.difference(found)
+        return (len(missing) == 0, list(missing))
 
     def _ensure_connected(self) -> None:
         """Ensure database connection is active, reconnecting if necessary."""
         if not self.is_connected():
             logger.warning("Database connection lost, attempting to reconnect...")
             self.conn = None  # Clear stale connection
+            self._metadata_ids_cache = None
             self.connect()
 
     def _with_connection_retry(self, func: Callable[[], T]) -> T:
@@ -162,31 +369,72 @@ class DBWriter:
 
             # Reconnect and retry once
             self.conn = None
+            self._metadata_ids_cache = None
             self._ensure_connected()
 
             # Retry the operation
             return func()
 
-    def _execute_batch_insert(
-        self, sql: str, records: List[Tuple], operation_name: str
+    def _get_cursor(self):
+        """Return the write-path cursor, creating it for a new connection.
+
+        The COPY/merge and stats statements run back to back for every
+        batch, so one cursor is kept per connection instead of opening and
+        closing one per statement group.
+        """
+        cur = self._cursor
+        if cur is None or cur.closed or cur.connection is not self.conn:
+            cur = self._cursor = self.conn.cursor()
+            self._staged_tables.clear()
+        return cur
+
+    def _copy_merge(
+        self,
+        payload: Union[str, bytes],
+        n_rows: int,
+        table: str,
+        columns: Sequence[str],
+        conflict_sql: str,
+        operation_name: str,
     ) -> int:
-        """Execute a batch insert operation with proper error handling.
+        """Bulk-load a COPY payload into `table` via a staging table.
+
+        COPY cannot express ON CONFLICT, so rows are streamed into a
+        session-local temp table (emptied on commit) and merged into
+        `table` with one `INSERT ... SELECT ... <conflict_sql>` statement.
+        The staging table is created once per connection; callers record it
+        in `_staged_tables` after their commit succeeds.
 
         Args:
-            sql: The SQL INSERT statement
-            records: List of tuples to insert
+            payload: CSV text, or bytes in binary COPY format
+            n_rows: Number of rows encoded in `payload`
+            table: Target table name
+            columns: Columns in `payload`, in COPY order
+            conflict_sql: ON CONFLICT clause appended to the merge
             operation_name: Name of the operation for error logging
 
         Returns:
-            Number of records inserted
+            Number of records loaded
         """
-        cur = self.conn.cursor()
+        # A fresh buffer per call so a retry after reconnect re-sends it all.
+        if isinstance(payload, bytes):
+            buf = io.BytesIO(payload)
+            copy_format = "BINARY"
+        else:
+            buf = io.StringIO(payload)
+            copy_format = "CSV"
+        create_sql, copy_sql, merge_sql = _copy_merge_sql(
+            table, tuple(columns), copy_format, conflict_sql
+        )
+
+        cur = self._get_cursor()
         try:
-            psycopg2.extras.execute_values(
-                cur, sql, records, template=None, page_size=1000
-            )
+            if table not in self._staged_tables:
+                cur.execute(create_sql)
+            cur.copy_expert(copy_sql, buf, size=self.copy_buffer_size)
+            cur.execute(merge_sql)
             # Do not commit here; caller will commit once to allow batching
-            return len(records)
+            return n_rows
         except Exception:
             try:
                 self.conn.rollback()
@@ -194,19 +442,20 @@ class DBWriter:
                 logger.exception("Failed rollback after %s error", operation_name)
             logger.exception("Failed to %s", operation_name)
             raise
-        finally:
-            if cur and not cur.closed:
-                cur.close()
 
     def _update_stats_for_cmls(self, cml_ids: List[str]) -> None:
         """Update cml_stats for the given CML IDs."""
         if not cml_ids:
             return
 
-        cur = self.conn.cursor()
+        cur = self._get_cursor()
         try:
-            for cml_id in cml_ids:
-                cur.execute("SELECT update_cml_stats(%s, %s)", (cml_id, self.user_id))
+            # One statement for all CMLs instead of one round trip (and one
+            # parse/plan) per CML.
+            cur.execute(
+                "SELECT update_cml_stats(c, %s) FROM unnest(%s::text[]) AS c",
+                (self.user_id, list(cml_ids)),
+            )
             # Do not commit here; caller should commit once after batch operations
             logger.info("Executed update_cml_stats for %d CMLs", len(cml_ids))
         except Exception:
@@ -216,9 +465,6 @@ class DBWriter:
                 logger.exception("Rollback failed while handling stats update error")
             logger.exception("Failed to update stats for CMLs: %s", cml_ids)
             raise
-        finally:
-            if cur and not cur.closed:
-                cur.close()
 
     def write_metadata(self, df) -> int:
         """Write metadata DataFrame to `cml_metadata`.
@@ -229,41 +475,26 @@ class DBWriter:
         if df is None or df.empty:
             return 0
 
-        # Convert DataFrame to list of tuples
-        cols = [
-            "cml_id",
-            "sublink_id",
-            "site_0_lon",
-            "site_0_lat",
-            "site_1_lon",
-            "site_1_lat",
-            "frequency",
-            "polarization",
-            "length",
-        ]
-        df_subset = df[cols].copy()
-        df_subset["cml_id"] = df_subset["cml_id"].astype(str)
-        df_subset["sublink_id"] = df_subset["sublink_id"].astype(str)
-        df_subset["user_id"] = self.user_id
-        records = [tuple(x) for x in df_subset[[*cols, "user_id"]].to_numpy()]
-
-        sql = (
-            "INSERT INTO cml_metadata "
-            "(cml_id, sublink_id, site_0_lon, site_0_lat, site_1_lon, site_1_lat, frequency, polarization, length, user_id) "
-            "VALUES %s "
-            "ON CONFLICT (cml_id, sublink_id, user_id) DO UPDATE SET "
-            "site_0_lon = EXCLUDED.site_0_lon, "
-            "site_0_lat = EXCLUDED.site_0_lat, "
-            "site_1_lon = EXCLUDED.site_1_lon, "
-            "site_1_lat = EXCLUDED.site_1_lat, "
-            "frequency = EXCLUDED.frequency, "
-            "polarization = EXCLUDED.polarization, "
-            "length = EXCLUDED.length"
+        cols = list(self._METADATA_COLUMNS)
+        df_subset = df[cols].assign(
+            cml_id=_as_text(df["cml_id"]),
+            sublink_id=_as_text(df["sublink_id"]),
+            user_id=self.user_id,
         )
+        # Keep the last row per key: the server then merges a clean set, and
+        # ON CONFLICT DO UPDATE cannot touch the same row twice in one command.
+        df_subset = df_subset.drop_duplicates(["cml_id", "sublink_id"], keep="last")
 
+        columns = list(self._METADATA_TYPES)
+        payload = encode_dataframe(df_subset, self._METADATA_TYPES)
         rows_written = self._with_connection_retry(
-            lambda: self._execute_batch_insert(
-                sql, records, "write metadata to database"
+            lambda: self._copy_merge(
+                payload,
+                len(df_subset),
+                "cml_metadata",
+                columns,
+                self._METADATA_CONFLICT_SQL,
+                "write metadata to database",
             )
         )
 
@@ -274,38 +505,73 @@ class DBWriter:
         except Exception:
             logger.exception("Failed to commit metadata write")
             raise
+        self._staged_tables.add("cml_metadata")
+
+        if self._metadata_ids_cache is None:
+            self._metadata_ids_cache = set()
+        self._metadata_ids_cache.update(
+            zip(df_subset["cml_id"], df_subset["sublink_id"])
+        )
 
         return rows_written
 
     def write_rawdata(self, df) -> int:
         """Write raw time series DataFrame to `cml_data`.
 
-        Expects df to have columns: time, cml_id, sublink_id, rsl, tsl
+        Expects df to have columns: time, cml_id, sublink_id, rsl, tsl.
+        time, cml_id and sublink_id may instead be index levels (as produced
+        by `xarray.Dataset.to_dataframe`); they are read in place, without
+        `reset_index()` copying the frame.
         Returns number of rows written.
         """
         if df is None or df.empty:
             return 0
 
-        # Convert DataFrame to list of tuples
-        cols = ["time", "cml_id", "sublink_id", "rsl", "tsl"]
-        df_subset = df[cols].copy()
-        df_subset["cml_id"] = df_subset["cml_id"].astype(str)
-        df_subset["sublink_id"] = (
-            df_subset["sublink_id"].astype(str).replace("nan", None)
+        return self.write_rawdata_arrays(
+            *(
+                _column_values(df, name)
+                for name in ("time", "cml_id", "sublink_id", "rsl", "tsl")
+            )
         )
-        df_subset["user_id"] = self.user_id
-        records = [tuple(x) for x in df_subset[[*cols, "user_id"]].to_numpy()]
 
-        sql = "INSERT INTO cml_data (time, cml_id, sublink_id, rsl, tsl, user_id) VALUES %s ON CONFLICT (time, cml_id, sublink_id, user_id) DO NOTHING"
+    def write_rawdata_arrays(self, time, cml_id, sublink_id, rsl, tsl) -> int:
+        """Write raw time series columns to `cml_data`.
 
+        Takes one equal-length array per column so callers holding NumPy
+        data (e.g. from netCDF) need not build a DataFrame first. Ids are
+        written as text; missing sublink ids and rsl/tsl values become NULL.
+        rsl/tsl are sent as 4-byte floats to match the REAL columns (about
+        7 significant digits, far below the 0.1 dB resolution of the data).
+        Returns number of rows written.
+        """
+        n_rows = len(time)
+        if n_rows == 0:
+            return 0
+
+        payload = encode_columns(
+            [
+                (time, "timestamptz"),
+                (cml_id, "text"),
+                (sublink_id, "text"),
+                (rsl, "float4"),
+                (tsl, "float4"),
+                ([self.user_id] * n_rows, "text"),
+            ]
+        )
         rows_written = self._with_connection_retry(
-            lambda: self._execute_batch_insert(
-                sql, records, "write raw data to database"
+            lambda: self._copy_merge(
+                payload,
+                n_rows,
+                "cml_data",
+                RAWDATA_COLUMNS,
+                self._RAWDATA_CONFLICT_SQL,
+                "write raw data to database",
             )
         )
 
         # Update lifetime stats for CMLs in this batch (same transaction as the insert)
-        cml_ids = df_subset["cml_id"].unique().tolist()
+        # Sorted so concurrent writers lock cml_stats rows in the same order.
+        cml_ids = sorted({str(c) for c in pd.unique(np.asarray(cml_id))})
         self._update_stats_for_cmls(cml_ids)
 
         # Single commit covers both the data insert and the stats update
@@ -315,6 +581,7 @@ class DBWriter:
         except Exception:
             logger.exception("Failed to commit raw data and stats")
             raise
+        self._staged_tables.add("cml_data")
 
         return rows_written
 
@@ -4,18 +4,24 @@ This module wires together the FileWatcher, DBWriter and FileManager to implemen
 """
 
 import json
+import multiprocessing
 import os
+import queue
 import time
 import logging
 import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
 from ..file_watcher import FileWatcher
 from ..file_manager import FileManager
-from ..db_writer import DBWriter
+from ..db_writer import DBWriter, DEFAULT_COPY_BUFFER_SIZE
 from ..service_logic import (
+    PARSE_AHEAD_EXTRA,
     load_parser,
     process_cml_file,
+    process_files_batch,
+    process_metadata_files_batch,
     process_rawdata_files_batch,
     _make_default_bundle,
 )
@@ -38,6 +44,26 @@ class Config:
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     # How often (seconds) to recalculate aggregate CML stats in the background
     STATS_REFRESH_INTERVAL = int(os.getenv("STATS_REFRESH_INTERVAL", "60"))
+    # Seconds to wait for the database to accept connections at startup
+    DB_WAIT_TIMEOUT = float(os.getenv("DB_WAIT_TIMEOUT", "30"))
+    # Threads writing batches of new files, each on its own DB connection
+    PARSER_WORKERS = int(os.getenv("PARSER_WORKERS", "4"))
+    # A batch closes once it holds this many files or this much time passed
+    PARSER_BATCH_MAX_FILES = int(os.getenv("PARSER_BATCH_MAX_FILES", "100"))
+    PARSER_BATCH_WAIT_MS = int(os.getenv("PARSER_BATCH_WAIT_MS", "500"))
+    # Processes parsing rawdata files in parallel; 0 or 1 parses in-thread
+    PARSER_PARSE_PROCESSES = int(os.getenv("PARSER_PARSE_PROCESSES", "0"))
+    # "off" stops each commit waiting for the WAL flush; a server crash can
+    # then lose the last few committed (and already archived) files
+    DB_SYNCHRONOUS_COMMIT = os.getenv("DB_SYNCHRONOUS_COMMIT") or None
+    # Chunk size (bytes) for COPY uploads; trades client memory for round trips
+    DB_COPY_BUFFER_SIZE = int(
+        os.getenv("DB_COPY_BUFFER_SIZE", str(DEFAULT_COPY_BUFFER_SIZE))
+    )
+
+
+# File name endings accepted by both the watcher and the startup scan.
+WATCHED_EXTENSIONS = (".csv", ".csv.zst", ".json")
 
 
 def setup_logging():
@@ -47,30 +73,146 @@ def setup_logging():
     )
 
 
-def process_existing_files(db_writer, file_manager, logger, parser=None):
-    incoming = sorted(f for f in Config.INCOMING_DIR.glob("*.csv") if f.is_file())
+def _scan_incoming():
+    """Return (csv_files, json_files) from one pass over INCOMING_DIR.
+
+    Files are ordered by modification time so older uploads are written
+    first and timestamps reach the hypertable roughly in order.
+    """
+    csv_files, json_files = [], []
+    with os.scandir(Config.INCOMING_DIR) as it:
+        for entry in it:
+            if not entry.is_file():
+                continue
+            name = entry.name.lower()
+            if not name.endswith(WATCHED_EXTENSIONS):
+                continue
+            key = (entry.stat().st_mtime, entry.name)
+            # *.csv.zst files are uploaded by SFTP senders with zstd
+            # compression enabled; pyarrow.csv picks the codec from the
+            # file extension when the parsers read them.
+            if name.endswith(".json"):
+                json_files.append((key, Path(entry.path)))
+            else:
+                csv_files.append((key, Path(entry.path)))
+    return (
+        [path for _, path in sorted(csv_files)],
+        [path for _, path in sorted(json_files)],
+    )
 
-    _parser = parser if parser is not None else _make_default_bundle()
 
-    metadata_files = [f for f in incoming if _parser.is_metadata_file(f.name.lower())]
-    data_files = [f for f in incoming if not _parser.is_metadata_file(f.name.lower())]
+def _next_batch(file_queue, max_files: int, max_wait: float) -> list:
+    """Take up to `max_files` paths from `file_queue`.
 
-    # Metadata files: process individually (typically just one)
-    for f in metadata_files:
+    Waits briefly for the first file (so callers can check for shutdown),
+    then keeps collecting for at most `max_wait` seconds.
+    """
+    try:
+        batch = [file_queue.get(timeout=0.5)]
+    except queue.Empty:
+        return []
+    deadline = time.monotonic() + max_wait
+    while len(batch) < max_files:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
         try:
-            process_cml_file(f, db_writer, file_manager, logger, parser=_parser)
-        except Exception:
-            pass
+            batch.append(file_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    return batch
+
+
+class _PendingFiles:
+    """Work queue of new files that drops repeat events for a pending file.
+
+    A path stays pending from its first event until a batch worker has
+    finished with it, so a second close or move event for the same upload
+    cannot hand the file to another worker while the first still holds it.
+    """
+
+    def __init__(self, file_queue):
+        self.queue = file_queue
+        self._paths = set()
+        self._lock = threading.Lock()
+
+    def put(self, path):
+        with self._lock:
+            if path in self._paths:
+                return
+            self._paths.add(path)
+        self.queue.put(path)
+
+    def done(self, paths):
+        with self._lock:
+            self._paths.difference_update(paths)
+
+
+def process_existing_files(
+    db_writer,
+    file_manager,
+    logger,
+    parser=None,
+    writer_factory=None,
+    max_workers: int = 1,
+    batch_size: int = 500,
+    parse_executor=None,
+    parse_ahead: int = 1 + PARSE_AHEAD_EXTRA,
+):
+    """Process files already waiting in INCOMING_DIR.
+
+    With `max_workers > 1` and a `writer_factory`, rawdata batches are
+    written concurrently, each worker on its own DBWriter so every COPY
+    runs on a separate Postgres backend. Rawdata files are parsed on
+    `parse_executor` when one is given, at most `parse_ahead` files ahead.
+    """
+    incoming, json_files = _scan_incoming()
+
+    _parser = parser if parser is not None else _make_default_bundle()
+
+    metadata_files, data_files = [], []
+    for f in incoming:
+        is_meta = _parser.is_metadata_file(f.name.lower())
+        (metadata_files if is_meta else data_files).append(f)
+
+    # Metadata files: parse together and write once, before any data files
+    # so their references resolve.
+    if metadata_files:
+        process_metadata_files_batch(
+            metadata_files, db_writer, file_manager, logger, parser=_parser
+        )
 
     # Data files: batch-process for efficiency
     if data_files:
         logger.info("Found %d data file(s) to process", len(data_files))
-        process_rawdata_files_batch(
-            data_files, db_writer, file_manager, logger, parser=_parser
-        )
+        batches = [
+            data_files[i : i + batch_size]
+            for i in range(0, len(data_files), batch_size)
+        ]
+        if max_workers > 1 and writer_factory is not None and len(batches) > 1:
+            _process_batches_in_parallel(
+                batches,
+                writer_factory,
+                file_manager,
+                logger,
+                _parser,
+                max_workers,
+                parse_executor,
+                parse_ahead,
+            )
+        else:
+            process_rawdata_files_batch(
+                data_files,
+                db_writer,
+                file_manager,
+                logger,
+                batch_size=batch_size,
+                parser=_parser,
+                parse_executor=parse_executor,
+                parse_ahead=parse_ahead,
+            )
 
     # JSON files (from api_fetcher): process individually
-    json_files = sorted(f for f in Config.INCOMING_DIR.glob("*.json") if f.is_file())
     for f in json_files:
         try:
             process_cml_file(f, db_writer, file_manager, logger, parser=_parser)
@@ -78,6 +220,52 @@ def process_existing_files(db_writer, file_manager, logger, parser=None):
             pass
 
 
+def _process_batches_in_parallel(
+    batches,
+    writer_factory,
+    file_manager,
+    logger,
+    parser,
+    max_workers,
+    parse_executor,
+    parse_ahead,
+):
+    """Write each rawdata batch on a pool thread with its own DBWriter."""
+    local = threading.local()
+    writers = []
+    writers_lock = threading.Lock()
+
+    def run(batch):
+        if not hasattr(local, "db_writer"):
+            local.db_writer = writer_factory()
+            with writers_lock:
+                writers.append(local.db_writer)
+        process_rawdata_files_batch(
+            batch,
+            local.db_writer,
+            file_manager,
+            logger,
+            batch_size=len(batch),
+            parser=parser,
+            parse_executor=parse_executor,
+            parse_ahead=parse_ahead,
+        )
+
+    workers = min(max_workers, len(batches))
+    try:
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="startup-ingest"
+        ) as executor:
+            for future in [executor.submit(run, batch) for batch in batches]:
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception("Startup batch failed")
+    finally:
+        for writer in writers:
+            writer.close()
+
+
 def main():
     setup_logging()
     logger = logging.getLogger("parser.service")
@@ -86,7 +274,16 @@ def main():
         str(Config.ARCHIVED_DIR),
         str(Config.QUARANTINE_DIR),
     )
-    db_writer = DBWriter(Config.DATABASE_URL, user_id=Config.USER_ID)
+
+    def make_db_writer():
+        return DBWriter(
+            Config.DATABASE_URL,
+            user_id=Config.USER_ID,
+            copy_buffer_size=Config.DB_COPY_BUFFER_SIZE,
+            synchronous_commit=Config.DB_SYNCHRONOUS_COMMIT,
+        )
+
+    db_writer = make_db_writer()
 
     # Select parser bundle based on PARSER_TYPE
     if Config.PARSER_TYPE == "api_json":
@@ -105,32 +302,89 @@ def main():
         logger.warning("Parser is disabled via configuration. Exiting.")
         return
 
-    try:
-        db_writer.connect()
-    except Exception:
-        logger.exception("Unable to connect to DB at startup")
+    # Returns as soon as the database accepts connections; on timeout the
+    # workers still connect lazily before their first write.
+    if not db_writer.wait_for_db(timeout=Config.DB_WAIT_TIMEOUT):
+        logger.error("Unable to connect to DB at startup")
+
+    # Parsing is CPU-bound pandas work; a process pool sidesteps the GIL.
+    # "spawn" keeps workers from inheriting locks held by this process's
+    # threads at fork time.
+    parse_executor = None
+    if Config.PARSER_PARSE_PROCESSES > 1:
+        parse_executor = ProcessPoolExecutor(
+            max_workers=Config.PARSER_PARSE_PROCESSES,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    # Parses kept in flight: one per worker process plus a small queue.
+    parse_ahead = Config.PARSER_PARSE_PROCESSES + PARSE_AHEAD_EXTRA
 
     if Config.PROCESS_EXISTING_ON_STARTUP:
-        process_existing_files(db_writer, file_manager, logger, parser=parser_bundle)
+        process_existing_files(
+            db_writer,
+            file_manager,
+            logger,
+            parser=parser_bundle,
+            writer_factory=make_db_writer,
+            max_workers=Config.PARSER_WORKERS,
+            parse_executor=parse_executor,
+            parse_ahead=parse_ahead,
+        )
 
-    def on_new_file(filepath):
-        try:
-            process_cml_file(
-                filepath, db_writer, file_manager, logger, parser=parser_bundle
+    # The watcher only queues new files; PARSER_WORKERS threads drain the
+    # queue in micro-batches so a burst of uploads is written with a few
+    # transactions instead of one per file.
+    stop_event = threading.Event()
+    file_queue: "queue.Queue[Path]" = queue.Queue()
+    pending = _PendingFiles(file_queue)
+    worker_db_writers = []
+
+    def batch_worker():
+        # Each worker owns its DBWriter: psycopg2 connections must not be
+        # shared between threads that run transactions concurrently.
+        worker_db = make_db_writer()
+        worker_db_writers.append(worker_db)
+        while not stop_event.is_set():
+            batch = _next_batch(
+                file_queue,
+                Config.PARSER_BATCH_MAX_FILES,
+                Config.PARSER_BATCH_WAIT_MS / 1000,
             )
-        except Exception:
-            pass
-
+            if not batch:
+                continue
+            try:
+                process_files_batch(
+                    batch,
+                    worker_db,
+                    file_manager,
+                    logger,
+                    parser=parser_bundle,
+                    parse_executor=parse_executor,
+                    parse_ahead=parse_ahead,
+                )
+            except Exception:
+                logger.exception("Failed to process batch of %d files", len(batch))
+            finally:
+                pending.done(batch)
+
+    workers = [
+        threading.Thread(target=batch_worker, daemon=True, name=f"batch-worker-{i}")
+        for i in range(Config.PARSER_WORKERS)
+    ]
+    for worker in workers:
+        worker.start()
+
+    # Enqueueing is instant, so the watcher calls it inline (no executor).
     watcher = FileWatcher(
         str(Config.INCOMING_DIR),
-        on_new_file,
-        {".csv", ".json"},
+        pending.put,
+        WATCHED_EXTENSIONS,
+        max_workers=0,
     )
     watcher.start()
 
     # Background thread: refresh cml_stats on a slow timer so it never
     # blocks file processing.
-    stop_event = threading.Event()
 
     def stats_loop():
         # Use a separate DBWriter connection so stats queries don't contend
@@ -139,12 +393,9 @@ def main():
 
         # Keep retrying until the DB is reachable (e.g. if it starts slowly).
         while not stop_event.is_set():
-            try:
-                stats_db.connect()
+            if stats_db.wait_for_db(timeout=Config.DB_WAIT_TIMEOUT):
                 break
-            except Exception:
-                logger.warning("Stats thread: DB not ready, retrying in 5s...")
-                stop_event.wait(5)
+            logger.warning("Stats thread: DB still not ready, waiting...")
         if stop_event.is_set():
             return
 
@@ -174,7 +425,15 @@ def main():
     finally:
         stop_event.set()
         watcher.stop()
+        # Files still queued stay in incoming and are picked up on restart.
+        for worker in workers:
+            if worker.is_alive():
+                worker.join()
         db_writer.close()
+        for writer in worker_db_writers:
+            writer.close()
+        if parse_executor is not None:
+            parse_executor.shutdown()
 
 
 if __name__ == "__main__":
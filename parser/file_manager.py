@@ -5,13 +5,25 @@ an accompanying `.error.txt` that contains failure details.
 """
 
 from pathlib import Path
+import errno
 import gzip
+import os
 import shutil
 import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Uploads that are already compressed are archived as they are.
+COMPRESSED_SUFFIXES = (".gz", ".zst")
+
+
+def _archive_name(name: str) -> str:
+    """Return the archive file name for an incoming file called `name`."""
+    if name.lower().endswith(COMPRESSED_SUFFIXES):
+        return name
+    return name + ".gz"
+
 
 class FileManager:
     def __init__(self, incoming_dir: str, archived_dir: str, quarantine_dir: str):
@@ -22,40 +34,84 @@ class FileManager:
         for d in (self.incoming_dir, self.archived_dir, self.quarantine_dir):
             d.mkdir(parents=True, exist_ok=True)
 
+        # Today's archive subdirectory, created once per day rather than on
+        # every archived file.
+        self._cached_archive_day = None
+        self._cached_archive_subdir = None
+
     def _archive_subdir(self) -> Path:
         today = datetime.date.today().isoformat()
+        if today == self._cached_archive_day:
+            return self._cached_archive_subdir
         subdir = self.archived_dir / today
         subdir.mkdir(parents=True, exist_ok=True)
+        self._cached_archive_subdir = subdir
+        self._cached_archive_day = today
         return subdir
 
     def _safe_move(self, filepath: Path, dest: Path) -> bool:
-        """Attempt to move file; fall back to copy if move fails. Returns True if successful."""
+        """Attempt to move file; fall back to copy if move fails. Returns True if successful.
+
+        A same-filesystem move is a single atomic rename. Only when the
+        rename is refused (cross-device or not permitted) is the file copied
+        and the original removed.
+        """
         try:
-            shutil.move(str(filepath), str(dest))
+            os.replace(filepath, dest)
             logger.info(f"Moved file {filepath} → {dest}")
             return True
-        except Exception:
-            try:
-                shutil.copy2(str(filepath), str(dest))
-                logger.info(f"Copied file {filepath} → {dest}")
-                return True
-            except Exception:
-                logger.exception("Failed to move or copy file")
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM):
+                logger.exception("Failed to move file")
                 return False
+        try:
+            shutil.copy2(filepath, dest)
+            logger.info(f"Copied file {filepath} → {dest}")
+        except OSError:
+            logger.exception("Failed to move or copy file")
+            return False
+        try:
+            os.unlink(filepath)
+        except OSError:
+            logger.warning(f"Could not remove {filepath} after copying it")
+        return True
 
     def archive_file(self, filepath: Path) -> Path:
-        """Gzip-compress `filepath` into archive/YYYY-MM-DD/ and return destination path."""
+        """Gzip-compress `filepath` into archive/YYYY-MM-DD/ and return destination path.
+
+        Files that are already compressed (`.gz`, `.zst`) are moved as they are.
+        """
         filepath = Path(filepath)
         if not filepath.exists():
             raise FileNotFoundError(f"File not found: {filepath}")
 
         dest_dir = self._archive_subdir()
-        dest = dest_dir / (filepath.name + ".gz")
+        name = _archive_name(filepath.name)
+        try:
+            return self._store_archive(filepath, dest_dir / name)
+        except FileNotFoundError:
+            if dest_dir.is_dir():
+                raise
+            # Today's directory was removed after it was cached; create it
+            # again and retry once.
+            self._cached_archive_day = None
+            return self._store_archive(filepath, self._archive_subdir() / name)
+
+    def _store_archive(self, filepath: Path, dest: Path) -> Path:
+        """Move or gzip `filepath` to `dest`; FileNotFoundError if a path is gone."""
+        if dest.name == filepath.name:
+            if not self._safe_move(filepath, dest):
+                if not dest.parent.is_dir():
+                    raise FileNotFoundError(f"Archive directory missing: {dest.parent}")
+                raise RuntimeError(f"Failed to archive file {filepath}")
+            return dest
         try:
             with filepath.open("rb") as f_in, gzip.open(dest, "wb") as f_out:
                 shutil.copyfileobj(f_in, f_out)
             filepath.unlink()
             logger.info(f"Archived (gzip) {filepath} → {dest}")
+        except FileNotFoundError:
+            raise
         except Exception:
             dest.unlink(missing_ok=True)
             raise RuntimeError(f"Failed to archive file {filepath}")
@@ -66,7 +122,6 @@ class FileManager:
         filepath = Path(filepath)
         if not filepath.exists():
             # If file doesn't exist, we still write an error note in quarantine
-            self.quarantine_dir.mkdir(parents=True, exist_ok=True)
             note_path = self.quarantine_dir / (filepath.name + ".error.txt")
             note_path.write_text(
                 f"Original file not found: {filepath}\nError: {error}\n"
@@ -101,4 +156,4 @@ class FileManager:
     def get_archived_path(self, filepath: Path) -> Path:
         """Return the destination archive path for a given filepath (without moving)."""
         subdir = self._archive_subdir()
-        return subdir / (Path(filepath).name + ".gz")
+        return subdir / _archive_name(Path(filepath).name)
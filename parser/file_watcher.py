@@ -1,47 +1,124 @@
-"""Watch for new files in the incoming directory and invoke a callback."""
+"""Watch for new files in the incoming directory and invoke a callback.
 
+On Linux the inotify observer reports IN_CLOSE_WRITE, so files are handed
+to the callback as soon as the uploader closes them. Other platforms fall
+back to polling the file size until it stops changing. Files renamed into
+the directory are dispatched immediately on every platform.
+"""
+
+import os
+import sys
 import time
 import logging
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 from watchdog.observers import Observer
-from watchdog.events import FileSystemEventHandler, FileCreatedEvent
+from watchdog.events import (
+    FileSystemEventHandler,
+    FileCreatedEvent,
+    FileClosedEvent,
+    FileMovedEvent,
+)
 
 logger = logging.getLogger(__name__)
 
+CLOSE_EVENTS_SUPPORTED = sys.platform.startswith("linux")
+
 
 class FileUploadHandler(FileSystemEventHandler):
-    def __init__(self, callback, supported_extensions):
+    def __init__(
+        self,
+        callback,
+        supported_extensions,
+        use_close_events: Optional[bool] = None,
+        executor: Optional[Executor] = None,
+    ):
         super().__init__()
         self.callback = callback
-        self.supported_extensions = supported_extensions
+        self.supported_extensions = frozenset(
+            e.lower() for e in supported_extensions or ()
+        )
+        # Matched as name endings, so multi-part suffixes such as ".csv.zst"
+        # work; str.endswith needs a tuple.
+        self._suffixes = tuple(self.supported_extensions)
+        self.use_close_events = (
+            CLOSE_EVENTS_SUPPORTED if use_close_events is None else use_close_events
+        )
+        # When set, callbacks run on the executor instead of the observer
+        # thread, so one slow file does not hold up the next.
+        self.executor = executor
         self.processing = set()
+        self._processing_lock = threading.Lock()
 
     def on_created(self, event: FileCreatedEvent):
-        if event.is_directory:
+        if event.is_directory or self.use_close_events:
             return
 
-        filepath = Path(event.src_path)
-        if (
-            self.supported_extensions
-            and filepath.suffix.lower() not in self.supported_extensions
-        ):
-            logger.debug(f"Ignoring unsupported file: {filepath.name}")
+        filepath = self._supported_path(event.src_path)
+        if filepath is None:
             return
 
         # Wait for file to stabilize
         self._wait_for_file_ready(filepath)
+        self._handle_file(filepath)
 
-        if str(filepath) in self.processing:
+    def on_closed(self, event: FileClosedEvent):
+        # Fired once the writer closes the file, so it is already complete.
+        if event.is_directory or not self.use_close_events:
             return
 
-        self.processing.add(str(filepath))
+        filepath = self._supported_path(event.src_path)
+        if filepath is None:
+            return
+
+        self._handle_file(filepath)
+
+    def on_moved(self, event: FileMovedEvent):
+        # Atomic uploads (write to a temp name, then rename) never produce a
+        # close event for the final name; the file is complete once renamed.
+        if event.is_directory:
+            return
+
+        filepath = self._supported_path(event.dest_path)
+        if filepath is None:
+            return
+
+        self._handle_file(filepath)
+
+    def _supported_path(self, path: str) -> Optional[Path]:
+        """Return `path` as a Path, or None if its suffix is not watched.
+
+        The suffix is checked on the raw string, so ignored events never
+        build a Path.
+        """
+        if self.supported_extensions:
+            if not path.lower().endswith(self._suffixes):
+                logger.debug(f"Ignoring unsupported file: {os.path.basename(path)}")
+                return None
+        return Path(path)
+
+    def _handle_file(self, filepath: Path):
+        with self._processing_lock:
+            if str(filepath) in self.processing:
+                return
+            self.processing.add(str(filepath))
+
+        if self.executor is not None:
+            self.executor.submit(self._run_callback, filepath)
+        else:
+            self._run_callback(filepath)
+
+    def _run_callback(self, filepath: Path):
         try:
             logger.info(f"Detected new file: {filepath}")
             self.callback(filepath)
         except Exception:
             logger.exception(f"Error processing file: {filepath}")
         finally:
-            self.processing.discard(str(filepath))
+            with self._processing_lock:
+                self.processing.discard(str(filepath))
 
     def _wait_for_file_ready(self, filepath: Path, timeout: int = 10):
         if not filepath.exists():
@@ -62,18 +139,40 @@ class FileUploadHandler(FileSystemEventHandler):
 
 
 class FileWatcher:
-    def __init__(self, watch_dir: str, callback, supported_extensions):
+    def __init__(
+        self,
+        watch_dir: str,
+        callback,
+        supported_extensions,
+        use_close_events: Optional[bool] = None,
+        max_workers: int = 1,
+    ):
         self.watch_dir = Path(watch_dir)
         self.callback = callback
-        self.supported_extensions = (
-            [e.lower() for e in supported_extensions] if supported_extensions else []
+        # Normalised once so each event is a single O(1) suffix lookup.
+        self.supported_extensions = frozenset(
+            e.lower() for e in supported_extensions or ()
         )
+        self.use_close_events = use_close_events
+        self.max_workers = max_workers
         self.observer = None
+        self._executor = None
 
     def start(self):
         if not self.watch_dir.exists():
             raise ValueError(f"Watch directory does not exist: {self.watch_dir}")
-        handler = FileUploadHandler(self.callback, self.supported_extensions)
+        # max_workers=0 runs the callback on the observer thread, for
+        # callbacks that only hand the path on.
+        if self.max_workers > 0:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="file-worker"
+            )
+        handler = FileUploadHandler(
+            self.callback,
+            self.supported_extensions,
+            self.use_close_events,
+            executor=self._executor,
+        )
         self.observer = Observer()
         self.observer.schedule(handler, str(self.watch_dir), recursive=False)
         self.observer.start()
@@ -84,3 +183,7 @@ class FileWatcher:
             self.observer.stop()
             self.observer.join()
             logger.info("Stopped file watcher")
+        if self._executor:
+            # Let files already handed to workers finish processing.
+            self._executor.shutdown(wait=True)
+            self._executor = None
@@ -12,7 +12,9 @@ The script preserves the original temporal resolution and time span of the NetCD
 import os
 import sys
 import io
-from datetime import datetime, timedelta
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
 import logging
 from pathlib import Path
 
@@ -21,6 +23,9 @@ import pandas as pd
 import numpy as np
 import psycopg2
 
+from parser.db_writer import KEEPALIVE_KWARGS
+from parser.pg_binary_copy import HEADER, TRAILER, encode_columns
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -59,8 +64,48 @@ DB_PASSWORD = os.getenv("POSTGRES_PASSWORD", "mypassword")
 DB_HOST = os.getenv("DB_HOST", "localhost")
 DB_PORT = os.getenv("DB_PORT", "5432")
 
+# Local server socket directory (Debian/PostgreSQL image default)
+DB_SOCKET_DIR = "/var/run/postgresql"
+
+# Session settings sent in the startup packet. A crashed load is simply
+# rerun (it starts with TRUNCATE), so commits need not wait for the WAL
+# flush; NOTICEs from TRUNCATE/CREATE INDEX are just noise here.
+DB_SESSION_OPTIONS = "-c synchronous_commit=off -c client_min_messages=warning"
+
 # Batch size for COPY operations (balance memory vs transaction size)
-BATCH_SIZE = 1000  # timestamps per batch (1000 × 728 = 728K rows per batch)
+# Timestamps per batch (1000 × 728 = 728K rows per batch); rounded up to whole
+# netCDF time chunks when the file is chunked.
+BATCH_SIZE = 1000
+
+# Batches read and encoded ahead of the one being COPYed
+PREFETCH_BATCHES = 2
+
+# Bytes copy_expert reads from the COPY stream per call (psycopg2's
+# default is 8 KB)
+COPY_READ_SIZE = 1 << 20
+
+# Column order of the cml_data COPY payload built per batch
+TIMESERIES_COLUMNS = ["time", "cml_id", "sublink_id", "tsl", "rsl", "user_id"]
+
+# cml_metadata columns and binary COPY types (REAL columns go as float4)
+METADATA_TYPES = {
+    "cml_id": "text",
+    "sublink_id": "text",
+    "site_0_lon": "float4",
+    "site_0_lat": "float4",
+    "site_1_lon": "float4",
+    "site_1_lat": "float4",
+    "frequency": "float4",
+    "polarization": "text",
+    "length": "float4",
+    "user_id": "text",
+}
+
+# Tables whose secondary indexes are dropped for the load and rebuilt after
+RELOADED_TABLES = ["cml_data", "cml_metadata"]
+
+# maintenance_work_mem for rebuilding those indexes (sorts in memory)
+INDEX_BUILD_MEMORY = os.getenv("ARCHIVE_INDEX_BUILD_MEMORY", "1GB")
 
 
 def download_netcdf(url, output_path):
@@ -146,29 +191,28 @@ def load_metadata_from_netcdf(ds):
         if pol_dims[0] == "sublink_id":
             polarization = polarization.T
 
-    # Build sublink_id -> column index mapping
-    sublink_idx_map = {sl: i for i, sl in enumerate(all_sublinks)}
-
-    metadata_records = []
-    for cml_idx, cml_id in enumerate(cml_ids):
-        for sl in valid_sublinks:
-            sl_col = sublink_idx_map[sl]
-            metadata_records.append(
-                {
-                    "cml_id": str(cml_id),
-                    "sublink_id": str(sl),
-                    "site_0_lon": float(site_0_lon[cml_idx]),
-                    "site_0_lat": float(site_0_lat[cml_idx]),
-                    "site_1_lon": float(site_1_lon[cml_idx]),
-                    "site_1_lat": float(site_1_lat[cml_idx]),
-                    "frequency": float(frequency[cml_idx, sl_col]),
-                    "polarization": str(polarization[cml_idx, sl_col]) if has_polarization else None,
-                    "length": float(length[cml_idx]),
-                    "user_id": USER_ID,
-                }
-            )
-
-    metadata_df = pd.DataFrame(metadata_records)
+    # One row per (cml_id, valid sublink), CML-major: per-CML columns are
+    # repeated per sublink, per-sublink columns are selected and ravelled.
+    valid_cols = np.flatnonzero(has_data)
+    n_valid = len(valid_cols)
+    metadata_df = pd.DataFrame(
+        {
+            "cml_id": np.repeat(np.asarray(cml_ids).astype(str), n_valid),
+            "sublink_id": np.tile(np.asarray(valid_sublinks).astype(str), len(cml_ids)),
+            "site_0_lon": np.repeat(site_0_lon.astype(float), n_valid),
+            "site_0_lat": np.repeat(site_0_lat.astype(float), n_valid),
+            "site_1_lon": np.repeat(site_1_lon.astype(float), n_valid),
+            "site_1_lat": np.repeat(site_1_lat.astype(float), n_valid),
+            "frequency": frequency[:, valid_cols].astype(float).ravel(),
+            "polarization": (
+                polarization[:, valid_cols].astype(str).ravel()
+                if has_polarization
+                else None
+            ),
+            "length": np.repeat(np.asarray(length).astype(float), n_valid),
+            "user_id": USER_ID,
+        }
+    )
     logger.info(
         f"Extracted {len(metadata_df)} metadata records "
         f"({metadata_df['cml_id'].nunique()} unique CML IDs, user_id='{USER_ID}')"
@@ -176,22 +220,151 @@ def load_metadata_from_netcdf(ds):
     return metadata_df, valid_sublinks
 
 
-def copy_dataframe_to_db(cursor, df, table_name, columns):
-    """Use PostgreSQL COPY FROM to efficiently load dataframe."""
-    buffer = io.StringIO()
-    df.to_csv(buffer, index=False, header=False, na_rep="\\N")
-    buffer.seek(0)
+def connect_kwargs():
+    """Return `psycopg2.connect` arguments for the archive database.
 
-    cursor.copy_from(buffer, table_name, sep=",", null="\\N", columns=columns)
+    A loader running next to the server connects over its UNIX socket
+    instead of TCP loopback; keepalives guard the long-running load.
+    """
+    host = DB_HOST
+    if host in ("localhost", "127.0.0.1") and os.path.exists(
+        os.path.join(DB_SOCKET_DIR, f".s.PGSQL.{DB_PORT}")
+    ):
+        host = DB_SOCKET_DIR
+    return dict(
+        dbname=DB_NAME,
+        user=DB_USER,
+        password=DB_PASSWORD,
+        host=host,
+        port=DB_PORT,
+        options=DB_SESSION_OPTIONS,
+        **KEEPALIVE_KWARGS,
+    )
 
 
-def load_timeseries_from_netcdf(ds, metadata_df, valid_sublinks, cursor, conn):
+def drop_secondary_indexes(cursor, tables):
+    """Drop the indexes on `tables` that do not back a constraint.
+
+    Building an index once over loaded rows is much cheaper than updating
+    it on every COPYed row. Returns the index definitions for
+    `recreate_indexes`. Primary key and unique indexes are kept.
+    """
+    cursor.execute(
+        """
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = ANY(%s::regclass[])
+          AND NOT EXISTS (
+              SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid
+          )
+        """,
+        (list(tables),),
+    )
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        logger.info(f"Dropping index {name} for the load")
+        cursor.execute(f"DROP INDEX {name}")
+    return [definition for _, definition in indexes]
+
+
+def recreate_indexes(cursor, index_definitions):
+    """Rebuild indexes dropped by `drop_secondary_indexes`."""
+    if not index_definitions:
+        return
+    cursor.execute("SET LOCAL maintenance_work_mem = %s", (INDEX_BUILD_MEMORY,))
+    for definition in index_definitions:
+        logger.info(f"Rebuilding index: {definition}")
+        cursor.execute(definition)
+
+
+def _chunk_aligned_batch_size(var, batch_size):
+    """Round `batch_size` up to a whole number of `var`'s time chunks.
+
+    NetCDF4/HDF5 decompresses whole chunks, so a batch that ends mid-chunk
+    makes the next batch decompress the same chunk again. Files without
+    chunking, or with time chunks larger than `batch_size`, keep it as is.
+    """
+    encoding = getattr(var, "encoding", None)
+    chunks = encoding.get("chunksizes") if isinstance(encoding, dict) else None
+    if not chunks:
+        return batch_size
+    time_chunk = int(chunks[list(var.dims).index("time")])
+    if time_chunk > batch_size:
+        return batch_size
+    return -(-batch_size // time_chunk) * time_chunk
+
+
+def _read_batch(var, sublink_indices, start, end):
+    """Read one time slab of `var` as a (time, cml_id, sublink_id) array.
+
+    Transposing by dimension name handles every layout of the netCDF
+    variables (OpenMRG, Orange Cameroun, time-first files) alike.
+    """
+    return (
+        var.isel(sublink_id=sublink_indices, time=slice(start, end))
+        .transpose("time", "cml_id", "sublink_id")
+        .values
+    )
+
+
+class _ChunkStream:
+    """Read-only file object over an iterator of byte chunks.
+
+    Lets `copy_expert` pull a COPY stream that is still being produced.
+    Reads are served as slices of the current chunk, so draining a large
+    batch payload in small reads never copies its unread remainder.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._chunk = memoryview(b"")
+        self._pos = 0
+
+    def read(self, size=-1):
+        while self._pos >= len(self._chunk):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                return b""
+            self._chunk, self._pos = memoryview(chunk), 0
+        if size < 0:
+            rest = [bytes(self._chunk[self._pos :])] + list(self._chunks)
+            self._chunk, self._pos = memoryview(b""), 0
+            return b"".join(rest)
+        data = bytes(self._chunk[self._pos : self._pos + size])
+        self._pos += len(data)
+        return data
+
+
+def copy_stream_to_db(cursor, table_name, columns, stream):
+    """Use binary COPY FROM to load a file object holding a COPY payload."""
+    cursor.copy_expert(
+        f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT BINARY)",
+        stream,
+        size=COPY_READ_SIZE,
+    )
+
+
+def copy_columns_to_db(cursor, table_name, columns):
+    """Use binary COPY FROM to load equal-length column arrays.
+
+    `columns` is a list of (name, values, pg_type) tuples; see
+    `pg_binary_copy` for the supported types. Skips the CSV round trip,
+    so the server does not parse floats and timestamps from text.
+    """
+    payload = encode_columns([(values, pg_type) for _, values, pg_type in columns])
+    copy_stream_to_db(
+        cursor, table_name, [name for name, _, _ in columns], io.BytesIO(payload)
+    )
+
+
+def load_timeseries_from_netcdf(ds, metadata_df, valid_sublinks, cursor):
     """
     Load time-series data from NetCDF with shifted timestamps.
 
     Handles both (sublink_id, cml_id, time) and (cml_id, sublink_id, time)
     dimension orders, and reads RSL/TSL from ARCHIVE_RSL_VAR / ARCHIVE_TSL_VAR.
-    Only valid_sublinks (non-all-NaN) are loaded.
+    Only valid_sublinks (non-all-NaN) are loaded. Does not commit; main()
+    commits the whole reload once.
     """
     logger.info("Loading time-series data...")
 
@@ -220,9 +393,13 @@ def load_timeseries_from_netcdf(ds, metadata_df, valid_sublinks, cursor, conn):
     n_timestamps = len(original_times)
 
     # Calculate time shift to end at current time
-    current_time = pd.Timestamp.now()
+    # Naive UTC: binary COPY sends naive timestamps as UTC.
+    current_time = pd.Timestamp.now(tz="UTC").tz_localize(None)
     time_shift = current_time - original_times[-1]
     shifted_times = original_times + time_shift
+    # Converted once to the encoder's microsecond resolution; batches
+    # slice and repeat this array instead of boxing Timestamps.
+    shifted_times_us = shifted_times.values.astype("datetime64[us]")
 
     logger.info(f"Original time range: {original_times[0]} to {original_times[-1]}")
     logger.info(f"Shifted time range:  {shifted_times[0]} to {shifted_times[-1]}")
@@ -232,10 +409,6 @@ def load_timeseries_from_netcdf(ds, metadata_df, valid_sublinks, cursor, conn):
     n_cmls = ds.sizes["cml_id"]
     cml_ids_nc = ds.cml_id.values
 
-    # Determine dimension order of RSL variable to set up indexing
-    rsl_dims = list(ds[RSL_VAR].dims)  # e.g. ['sublink_id','cml_id','time'] or ['cml_id','sublink_id','time']
-    sublink_first = rsl_dims.index("sublink_id") < rsl_dims.index("cml_id")
-
     # Map sublink_id string -> integer position in ds.sublink_id
     all_sublinks = list(ds.sublink_id.values)
     valid_sl_indices = [all_sublinks.index(sl) for sl in valid_sublinks]
@@ -245,109 +418,113 @@ def load_timeseries_from_netcdf(ds, metadata_df, valid_sublinks, cursor, conn):
     logger.info(
         f"Total data points: {n_timestamps:,} timestamps × {n_cmls} CMLs × {n_sublinks} sublinks = {total_rows:,} rows"
     )
-    logger.info(f"Processing in batches of {BATCH_SIZE:,} timestamps...")
 
-    start_time = datetime.now()
-    rows_loaded = 0
-
-    # Process in batches to manage memory
-    for batch_num, batch_start_rel in enumerate(range(0, n_timestamps, BATCH_SIZE), 1):
-        batch_end_rel = min(batch_start_rel + BATCH_SIZE, n_timestamps)
-        batch_times = shifted_times[batch_start_rel:batch_end_rel]
+    # Id columns for one timestamp (CML-major, sublink-minor) as small
+    # integer codes into the id strings; tiled per batch and encoded from
+    # the categories, so no per-row string objects are built.
+    rows_per_timestamp = n_cmls * n_sublinks
+    cml_categories = pd.Index(np.asarray(cml_ids_nc).astype(str))
+    sublink_categories = pd.Index(np.asarray(valid_sublinks).astype(str))
+    user_categories = pd.Index([USER_ID])
+    cml_code_col = np.repeat(np.arange(n_cmls, dtype=np.int32), n_sublinks)
+    sublink_code_col = np.tile(np.arange(n_sublinks, dtype=np.int32), n_cmls)
+
+    # Process in batches to manage memory. Batch edges fall on multiples of
+    # batch_size in file coordinates, i.e. on netCDF chunk boundaries, so
+    # no compressed chunk is read and decompressed for two batches.
+    batch_size = _chunk_aligned_batch_size(ds[RSL_VAR], BATCH_SIZE)
+    logger.info(f"Processing in batches of {batch_size:,} timestamps...")
+    first_edge = batch_size - start_idx % batch_size
+    edges = [0] + list(range(first_edge, n_timestamps, batch_size)) + [n_timestamps]
+    batches = list(zip(edges[:-1], edges[1:]))
+    total_batches = len(batches)
+
+    def prepare_batch(batch_start_rel, batch_end_rel):
+        """Read, flatten and encode one batch; returns (rows, COPY payload)."""
+        batch_times = shifted_times_us[batch_start_rel:batch_end_rel]
         batch_size_actual = batch_end_rel - batch_start_rel
 
         # Convert relative indices to absolute NetCDF indices
         batch_start_abs = start_idx + batch_start_rel
         batch_end_abs = start_idx + batch_end_rel
 
-        # Load only this batch's data from NetCDF (valid sublinks only)
-        if sublink_first:
-            # (sublink_id, cml_id, time) -> select valid sublinks, slice time
-            tsl_batch = ds[TSL_VAR].isel(
-                sublink_id=valid_sl_indices,
-                time=slice(batch_start_abs, batch_end_abs),
-            ).values  # (n_valid_sublinks, n_cmls, batch_size)
-            rsl_batch = ds[RSL_VAR].isel(
-                sublink_id=valid_sl_indices,
-                time=slice(batch_start_abs, batch_end_abs),
-            ).values
-            # reshape to (batch_size, n_valid_sublinks, n_cmls)
-            tsl_batch = np.transpose(tsl_batch, (2, 0, 1))
-            rsl_batch = np.transpose(rsl_batch, (2, 0, 1))
-        else:
-            # (cml_id, sublink_id, time) -> select valid sublinks, slice time
-            tsl_batch = ds[TSL_VAR].isel(
-                sublink_id=valid_sl_indices,
-                time=slice(batch_start_abs, batch_end_abs),
-            ).values  # (n_cmls, n_valid_sublinks, batch_size)
-            rsl_batch = ds[RSL_VAR].isel(
-                sublink_id=valid_sl_indices,
-                time=slice(batch_start_abs, batch_end_abs),
-            ).values
-            # reshape to (batch_size, n_valid_sublinks, n_cmls)
-            tsl_batch = np.transpose(tsl_batch, (2, 1, 0))
-            rsl_batch = np.transpose(rsl_batch, (2, 1, 0))
-
-        # Reshape data for database insertion
-        # Create arrays for each column
-        batch_rows = batch_size_actual * n_cmls * n_sublinks
-
-        # Pre-allocate arrays
-        times_arr = np.empty(batch_rows, dtype="datetime64[ns]")
-        cml_ids_arr = np.empty(batch_rows, dtype=object)
-        sublink_ids_arr = np.empty(batch_rows, dtype=object)
-        tsl_arr = np.empty(batch_rows, dtype=float)
-        rsl_arr = np.empty(batch_rows, dtype=float)
-        user_ids_arr = np.full(batch_rows, USER_ID, dtype=object)
-
-        idx = 0
-        for t_idx, timestamp in enumerate(batch_times):
-            for cml_idx, cml_id in enumerate(cml_ids_nc):
-                for sl_rel, sl in enumerate(valid_sublinks):
-                    times_arr[idx] = timestamp
-                    cml_ids_arr[idx] = str(cml_id)
-                    sublink_ids_arr[idx] = str(sl)
-                    tsl_arr[idx] = tsl_batch[t_idx, sl_rel, cml_idx]
-                    rsl_arr[idx] = rsl_batch[t_idx, sl_rel, cml_idx]
-                    idx += 1
-
-        # Create DataFrame from arrays
-        batch_df = pd.DataFrame(
-            {
-                "time": times_arr,
-                "cml_id": cml_ids_arr,
-                "sublink_id": sublink_ids_arr,
-                "tsl": tsl_arr,
-                "rsl": rsl_arr,
-                "user_id": user_ids_arr,
-            }
+        # Load only this batch's data from NetCDF (valid sublinks only),
+        # flattened into rows ordered by time, CML, sublink.
+        tsl_arr = _read_batch(
+            ds[TSL_VAR], valid_sl_indices, batch_start_abs, batch_end_abs
+        ).reshape(-1)
+        rsl_arr = _read_batch(
+            ds[RSL_VAR], valid_sl_indices, batch_start_abs, batch_end_abs
+        ).reshape(-1)
+        times_arr = np.repeat(batch_times, rows_per_timestamp)
+        cml_ids_arr = pd.Categorical.from_codes(
+            np.tile(cml_code_col, batch_size_actual), categories=cml_categories
         )
-
-        # Load batch to database
-        copy_dataframe_to_db(
-            cursor,
-            batch_df,
-            "cml_data",
-            ["time", "cml_id", "sublink_id", "tsl", "rsl", "user_id"],
+        sublink_ids_arr = pd.Categorical.from_codes(
+            np.tile(sublink_code_col, batch_size_actual),
+            categories=sublink_categories,
+        )
+        user_ids_arr = pd.Categorical.from_codes(
+            np.zeros(len(tsl_arr), dtype=np.int8), categories=user_categories
         )
 
-        rows_loaded += len(batch_df)
+        payload = encode_columns(
+            [
+                (times_arr, "timestamptz"),
+                (cml_ids_arr, "text"),
+                (sublink_ids_arr, "text"),
+                (tsl_arr, "float4"),
+                (rsl_arr, "float4"),
+                (user_ids_arr, "text"),
+            ]
+        )
+        return len(tsl_arr), payload
 
-        # Log progress every batch
-        elapsed = (datetime.now() - start_time).total_seconds()
-        progress = (rows_loaded / total_rows) * 100
-        rate = rows_loaded / elapsed if elapsed > 0 else 0
+    start_time = datetime.now()
+    rows_loaded = 0
 
-        total_batches = (n_timestamps + BATCH_SIZE - 1) // BATCH_SIZE
-        logger.info(
-            f"  Batch {batch_num}/{total_batches}: "
-            f"{progress:5.1f}% complete, {rate:,.0f} rows/sec"
+    def batch_payloads(reader):
+        """Yield one COPY stream: header, each batch's tuples, trailer."""
+        nonlocal rows_loaded
+        pending = deque(
+            reader.submit(prepare_batch, *batch)
+            for batch in batches[:PREFETCH_BATCHES]
         )
+        yield HEADER
+        for batch_num in range(1, total_batches + 1):
+            n_rows, payload = pending.popleft().result()
+            next_batch = batch_num - 1 + PREFETCH_BATCHES
+            if next_batch < total_batches:
+                pending.append(reader.submit(prepare_batch, *batches[next_batch]))
+
+            yield payload[len(HEADER) : len(payload) - len(TRAILER)]
+            rows_loaded += n_rows
 
-        # Commit periodically (every 10 batches)
-        if (batch_num % 10) == 0 or batch_end_rel == n_timestamps:
-            conn.commit()
-            logger.info(f"  ✓ Committed to database")
+            # Log progress every batch
+            elapsed = (datetime.now() - start_time).total_seconds()
+            progress = (rows_loaded / total_rows) * 100
+            rate = rows_loaded / elapsed if elapsed > 0 else 0
+
+            logger.info(
+                f"  Batch {batch_num}/{total_batches}: "
+                f"{progress:5.1f}% complete, {rate:,.0f} rows/sec"
+            )
+        yield TRAILER
+
+    # Pipeline: a reader thread decodes (HDF5) and encodes the next batches
+    # while this thread streams the current one to PostgreSQL. Only the
+    # reader touches `ds`; PREFETCH_BATCHES bounds the payloads in memory.
+    # All batches go through a single COPY, so there is no per-batch
+    # statement round trip.
+    with ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="archive-reader"
+    ) as reader:
+        copy_stream_to_db(
+            cursor,
+            "cml_data",
+            TIMESERIES_COLUMNS,
+            _ChunkStream(batch_payloads(reader)),
+        )
 
     total_duration = (datetime.now() - start_time).total_seconds()
     logger.info(f"Loaded {rows_loaded:,} data records in {total_duration:.0f} seconds")
@@ -386,13 +563,7 @@ def main():
     # Connect to database
     logger.info("Connecting to database...")
     try:
-        conn = psycopg2.connect(
-            dbname=DB_NAME,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            host=DB_HOST,
-            port=DB_PORT,
-        )
+        conn = psycopg2.connect(**connect_kwargs())
         conn.autocommit = False
         cursor = conn.cursor()
         logger.info("Database connection established")
@@ -402,39 +573,34 @@ def main():
         sys.exit(1)
 
     try:
-        # Clear existing data before loading archive
+        # The whole reload (index drop, truncate, both COPYs and the index
+        # rebuild) is one transaction: if the loader dies part way, even by
+        # SIGKILL or OOM, PostgreSQL rolls it all back and the old data and
+        # indexes stay in place.
         logger.info("Clearing existing database data...")
+        index_definitions = drop_secondary_indexes(cursor, RELOADED_TABLES)
         cursor.execute("TRUNCATE TABLE cml_data")
         cursor.execute("TRUNCATE TABLE cml_metadata")
-        conn.commit()
         logger.info("Existing data cleared")
 
         # Load metadata
         metadata_df, valid_sublinks = load_metadata_from_netcdf(ds)
 
         logger.info("Loading metadata to database...")
-        copy_dataframe_to_db(
+        copy_columns_to_db(
             cursor,
-            metadata_df,
             "cml_metadata",
-            [
-                "cml_id",
-                "sublink_id",
-                "site_0_lon",
-                "site_0_lat",
-                "site_1_lon",
-                "site_1_lat",
-                "frequency",
-                "polarization",
-                "length",
-                "user_id",
-            ],
+            [(c, metadata_df[c].values, t) for c, t in METADATA_TYPES.items()],
         )
-        conn.commit()
         logger.info(f"✓ Loaded {len(metadata_df)} metadata records")
 
         # Load time-series data
-        rows_loaded = load_timeseries_from_netcdf(ds, metadata_df, valid_sublinks, cursor, conn)
+        rows_loaded = load_timeseries_from_netcdf(ds, metadata_df, valid_sublinks, cursor)
+
+        logger.info("Rebuilding indexes...")
+        recreate_indexes(cursor, index_definitions)
+        conn.commit()
+        logger.info("  ✓ Committed to database")
 
         # Verify loaded data
         cursor.execute(
@@ -457,6 +623,7 @@ def main():
 
     except Exception as e:
         logger.error(f"Error during data loading: {e}")
+        # Undoes the index drop and truncate along with the partial load.
         conn.rollback()
         raise
     finally:
@@ -34,7 +34,6 @@ import os
 from pathlib import Path
 
 import pandas as pd
-import yaml
 
 logger = logging.getLogger(__name__)
 
@@ -44,6 +43,10 @@ _REQUIRED_OUTPUT_COLS = ["time", "cml_id", "sublink_id", "rsl", "tsl"]
 
 
 def _load_field_map(field_map_path: str) -> dict:
+    # Imported here: only the api_json parser type reads a field map, and
+    # every parser service imports this module at startup.
+    import yaml
+
     with open(field_map_path) as f:
         return yaml.safe_load(f)
 
@@ -1,13 +1,31 @@
 """Parse CML metadata CSV files."""
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from pathlib import Path
 from typing import Optional
 
+# Declaring the text columns up front skips type inference and keeps ids
+# such as "00101" verbatim; empty cells become null, matching pandas.
+# Numeric columns are inferred by Arrow's multithreaded reader, which
+# yields float64 directly for clean files.
+_CONVERT_OPTIONS = pacsv.ConvertOptions(
+    column_types={
+        "cml_id": pa.string(),
+        "sublink_id": pa.string(),
+        "polarization": pa.string(),
+    },
+    strings_can_be_null=True,
+)
+_COORD_COLUMNS = ["site_0_lon", "site_0_lat", "site_1_lon", "site_1_lat"]
+
 
 def parse_metadata_csv(filepath: Path) -> Optional[pd.DataFrame]:
-    df = pd.read_csv(filepath)
-    df["cml_id"] = df["cml_id"].astype(str)
-    for col in ["site_0_lon", "site_0_lat", "site_1_lon", "site_1_lat"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
+    table = pacsv.read_csv(filepath, convert_options=_CONVERT_OPTIONS)
+    df = table.to_pandas()
+    for col in _COORD_COLUMNS:
+        # Only columns with unparseable values need coercing to NaN.
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
     return df
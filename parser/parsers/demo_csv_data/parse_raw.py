@@ -1,15 +1,33 @@
 """Parse raw CML time series CSV files."""
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from pathlib import Path
 from typing import Optional
 
+_VALUE_COLUMNS = ["tsl", "rsl"]
+
+# Ids are declared as text so they stay verbatim; empty cells become null,
+# matching pandas. Time and values are typed by Arrow's multithreaded
+# reader, so clean files need no second conversion pass. Only the canonical
+# columns are converted; any extra columns in the file are skipped.
+_CONVERT_OPTIONS = pacsv.ConvertOptions(
+    column_types={"cml_id": pa.string(), "sublink_id": pa.string()},
+    strings_can_be_null=True,
+    include_columns=["time", "cml_id", "sublink_id"] + _VALUE_COLUMNS,
+)
+
 
 def parse_rawdata_csv(filepath: Path) -> Optional[pd.DataFrame]:
-    df = pd.read_csv(filepath)
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
+    table = pacsv.read_csv(filepath, convert_options=_CONVERT_OPTIONS)
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
+    # Only columns Arrow could not type (bad values) need coercing.
+    if not pd.api.types.is_datetime64_any_dtype(df["time"]):
+        df["time"] = pd.to_datetime(df["time"], errors="coerce")
     df["cml_id"] = df["cml_id"].fillna("nan").astype(str)
-    df["sublink_id"] = df["sublink_id"].astype(str)
-    df["tsl"] = pd.to_numeric(df["tsl"], errors="coerce")
-    df["rsl"] = pd.to_numeric(df["rsl"], errors="coerce")
+    df["sublink_id"] = df["sublink_id"].fillna("nan").astype(str)
+    for col in _VALUE_COLUMNS:
+        if not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df[col], errors="coerce")
     return df
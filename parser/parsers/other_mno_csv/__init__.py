@@ -10,9 +10,21 @@ Differences from demo_csv_data:
 """
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
 from pathlib import Path
 from typing import Optional
 
+# Raw files are read with Arrow's multithreaded reader: ids stay verbatim
+# text and times/values are typed on read, so clean files skip the pandas
+# conversion pass. Offsets in the timestamps are applied (times come back
+# in UTC).
+_RAW_PARSE_OPTIONS = pacsv.ParseOptions(delimiter=";")
+_RAW_CONVERT_OPTIONS = pacsv.ConvertOptions(
+    column_types={"link_id": pa.string(), "sublink": pa.string()},
+    strings_can_be_null=True,
+)
+
 
 def parse_rawdata_csv(filepath: Path) -> Optional[pd.DataFrame]:
     """Parse raw data CSV from OtherMNO format.
@@ -23,7 +35,12 @@ def parse_rawdata_csv(filepath: Path) -> Optional[pd.DataFrame]:
     Output columns (canonical):
         time, cml_id, sublink_id, tsl, rsl
     """
-    df = pd.read_csv(filepath, sep=";")
+    table = pacsv.read_csv(
+        filepath,
+        parse_options=_RAW_PARSE_OPTIONS,
+        convert_options=_RAW_CONVERT_OPTIONS,
+    )
+    df = table.to_pandas(split_blocks=True, self_destruct=True)
 
     # Rename to canonical names
     df = df.rename(
@@ -36,14 +53,16 @@ def parse_rawdata_csv(filepath: Path) -> Optional[pd.DataFrame]:
         }
     )
 
-    # Parse timestamps (they include timezone offset)
-    df["time"] = pd.to_datetime(df["time"], errors="coerce")
+    # Only columns Arrow could not type (bad values) need coercing.
+    if not pd.api.types.is_datetime64_any_dtype(df["time"]):
+        df["time"] = pd.to_datetime(df["time"], errors="coerce", utc=True)
 
     # Ensure canonical types
     df["cml_id"] = df["cml_id"].fillna("nan").astype(str)
-    df["sublink_id"] = df["sublink_id"].astype(str)
-    df["tsl"] = pd.to_numeric(df.get("tsl"), errors="coerce")
-    df["rsl"] = pd.to_numeric(df.get("rsl"), errors="coerce")
+    df["sublink_id"] = df["sublink_id"].fillna("nan").astype(str)
+    for col in ["tsl", "rsl"]:
+        if col not in df.columns or not pd.api.types.is_numeric_dtype(df[col]):
+            df[col] = pd.to_numeric(df.get(col), errors="coerce")
 
     return df
 
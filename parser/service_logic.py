@@ -3,15 +3,26 @@ Core logic for processing CML data files, extracted from ParserService.
 This module is designed for unit testing and reuse.
 """
 
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
+import collections
+import functools
+import heapq
+import itertools
 import logging
-from typing import Callable, Dict, List, Optional
+from typing import Callable, Deque, Dict, List, Optional
 import pandas as pd
 from .parsers.demo_csv_data.parse_raw import parse_rawdata_csv
 from .parsers.demo_csv_data.parse_metadata import parse_metadata_csv
 from .parsers.api_json.parse_raw import parse_api_json_raw
 
+# Rows held in memory before a rawdata batch is written early
+DEFAULT_MAX_BATCH_ROWS = 1_000_000
+
+# Parses queued on a parse executor beyond its worker count
+PARSE_AHEAD_EXTRA = 2
+
 
 @dataclass
 class ParserBundle:
@@ -86,20 +97,23 @@ def load_parser(parser_type: str, csv_config: Optional[dict] = None) -> ParserBu
             parse_metadata_csv as _parse_meta,
         )
 
-        meta_kw = config.get("metadata_filename_keyword", "meta")
-        raw_kw = config.get("rawdata_filename_keyword")
+        # Keywords are lowered once here rather than on every classified file.
+        meta_kw = config.get("metadata_filename_keyword", "meta").lower()
+        raw_kw = (config.get("rawdata_filename_keyword") or "").lower()
 
         def _is_metadata(name: str) -> bool:
-            return meta_kw.lower() in name.lower()
+            return meta_kw in name.lower()
 
         def _is_rawdata(name: str) -> bool:
             if raw_kw:
-                return raw_kw.lower() in name.lower()
+                return raw_kw in name.lower()
             return not _is_metadata(name)
 
+        # partials rather than lambdas, so the parse functions can be
+        # pickled to a process pool.
         return ParserBundle(
-            parse_rawdata=lambda fp: _parse_raw(fp, config),
-            parse_metadata=lambda fp: _parse_meta(fp, config),
+            parse_rawdata=functools.partial(_parse_raw, config=config),
+            parse_metadata=functools.partial(_parse_meta, config=config),
             is_metadata_file=_is_metadata,
             is_rawdata_file=_is_rawdata,
         )
@@ -123,6 +137,109 @@ def load_api_json_bundle() -> ParserBundle:
     )
 
 
+def process_metadata_files_batch(
+    filepaths: List[Path],
+    db_writer,
+    file_manager,
+    logger=None,
+    parser: Optional[ParserBundle] = None,
+    max_workers: int = 4,
+    fallback_to_single: bool = False,
+) -> None:
+    """Process a list of metadata files with a single write + commit.
+
+    Files are parsed concurrently, combined, and written in one
+    `write_metadata` call; rows from later files win when the same
+    (cml_id, sublink_id) appears more than once, as with sequential
+    processing.
+
+    Files that fail to parse are quarantined individually.  If the batch
+    write fails the files remain in the incoming directory so a subsequent
+    restart can retry them, or, with `fallback_to_single`, are retried one
+    by one via `process_cml_file` so only the offending file is quarantined.
+    """
+    if logger is None:
+        logger = logging.getLogger("parser.logic")
+    if parser is None:
+        parser = _make_default_bundle()
+    if not filepaths:
+        return
+
+    logger.info("Batch-processing %d metadata files", len(filepaths))
+
+    def _parse(filepath: Path):
+        try:
+            return parser.parse_metadata(filepath)
+        except Exception:
+            logger.exception("Failed to parse %s, quarantining", filepath.name)
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(_parse, filepaths))
+
+    dfs: List[pd.DataFrame] = []
+    parsed_files: List[Path] = []
+    file_row_counts: Dict[Path, int] = {}
+    for filepath, df in zip(filepaths, results):
+        if df is not None and not df.empty:
+            dfs.append(df)
+            parsed_files.append(filepath)
+            file_row_counts[filepath] = len(df)
+            continue
+        if filepath.exists():
+            file_manager.quarantine_file(
+                filepath, "Parse error during batch processing"
+            )
+        db_writer.log_file_event(
+            filepath.name,
+            "quarantined",
+            error_message="Parse error during batch processing",
+        )
+
+    if not dfs:
+        logger.info("No parseable metadata files, skipping write")
+        return
+
+    combined = pd.concat(dfs, ignore_index=True)
+    try:
+        db_writer.connect()
+        rows = db_writer.write_metadata(combined)
+        logger.info("Wrote %d metadata rows from %d files", rows, len(parsed_files))
+        for filepath in parsed_files:
+            file_manager.archive_file(filepath)
+            db_writer.log_file_event(
+                filepath.name,
+                "archived",
+                rows_written=file_row_counts.get(filepath),
+            )
+    except Exception:
+        if fallback_to_single:
+            logger.exception("Metadata batch write failed; retrying file by file")
+            _process_individually(parsed_files, db_writer, file_manager, logger, parser)
+            return
+        logger.exception(
+            "Metadata batch write failed; %d files remain in incoming for retry",
+            len(parsed_files),
+        )
+
+
+def _parse_ahead(executor: Executor, parse, filepaths: List[Path], window: int):
+    """Yield a result getter per file, parsing ahead on *executor*.
+
+    At most *window* parses are submitted but not yet consumed, so parsed
+    frames waiting for their turn cannot pile up beyond that.
+    """
+    futures: Deque[Future] = collections.deque()
+    remaining = iter(filepaths)
+    for filepath in itertools.islice(remaining, window):
+        futures.append(executor.submit(parse, filepath))
+    while futures:
+        yield futures.popleft().result
+        # Top up only once the previous result has been consumed.
+        for filepath in itertools.islice(remaining, 1):
+            futures.append(executor.submit(parse, filepath))
+
+
 def process_rawdata_files_batch(
     filepaths: List[Path],
     db_writer,
@@ -130,16 +247,28 @@ def process_rawdata_files_batch(
     logger=None,
     batch_size: int = 500,
     parser: Optional[ParserBundle] = None,
+    fallback_to_single: bool = False,
+    parse_executor: Optional[Executor] = None,
+    max_batch_rows: Optional[int] = DEFAULT_MAX_BATCH_ROWS,
+    parse_ahead: int = 1 + PARSE_AHEAD_EXTRA,
 ) -> None:
     """Process a list of rawdata CSV files in batches.
 
     Instead of one commit per file, accumulates DataFrames across `batch_size`
     files and issues a single write + commit per batch.  This is orders of
-    magnitude faster for large backlogs.
+    magnitude faster for large backlogs.  A batch is written early once it
+    holds `max_batch_rows` rows, which bounds memory when files are large.
+
+    With a `parse_executor` (typically a ProcessPoolExecutor) the files of
+    a batch are parsed concurrently, at most `parse_ahead` files ahead of
+    the one being consumed (size it as the executor's worker count plus
+    `PARSE_AHEAD_EXTRA`); `parser.parse_rawdata` must then be picklable.
+    Writes stay on the calling thread.
 
     Files that fail to parse are quarantined individually.  If the batch
     write fails the files remain in the incoming directory so a subsequent
-    restart can retry them.
+    restart can retry them, or, with `fallback_to_single`, are retried one
+    by one via `process_cml_file` so only the offending file is quarantined.
     """
     if logger is None:
         logger = logging.getLogger("parser.logic")
@@ -147,8 +276,43 @@ def process_rawdata_files_batch(
         parser = _make_default_bundle()
 
     total = len(filepaths)
+    n_batches = -(-total // batch_size)
     logger.info("Batch-processing %d data files (batch_size=%d)", total, batch_size)
 
+    def _write(batch_num, dfs, parsed_files, file_row_counts):
+        combined = pd.concat(dfs, ignore_index=True)
+        try:
+            db_writer.connect()
+            rows = db_writer.write_rawdata(combined)
+            logger.info(
+                "Batch %d/%d: wrote %d rows from %d files",
+                batch_num,
+                n_batches,
+                rows,
+                len(parsed_files),
+            )
+            for filepath in parsed_files:
+                file_manager.archive_file(filepath)
+                db_writer.log_file_event(
+                    filepath.name,
+                    "archived",
+                    rows_written=file_row_counts.get(filepath),
+                )
+        except Exception:
+            if fallback_to_single:
+                logger.exception(
+                    "Batch %d write failed; retrying file by file", batch_num
+                )
+                _process_individually(
+                    parsed_files, db_writer, file_manager, logger, parser
+                )
+                return
+            logger.exception(
+                "Batch %d write failed; %d files remain in incoming for retry",
+                batch_num,
+                len(parsed_files),
+            )
+
     for batch_start in range(0, total, batch_size):
         batch = filepaths[batch_start : batch_start + batch_size]
         batch_num = batch_start // batch_size + 1
@@ -157,19 +321,35 @@ def process_rawdata_files_batch(
         parsed_files: List[Path] = []
         failed_files: List[Path] = []
         file_row_counts: Dict[Path, int] = {}
+        pending_rows = 0
+        written_early = False
 
-        for filepath in batch:
+        if parse_executor is not None:
+            parsed = _parse_ahead(
+                parse_executor, parser.parse_rawdata, batch, parse_ahead
+            )
+        else:
+            parsed = [functools.partial(parser.parse_rawdata, fp) for fp in batch]
+
+        for filepath, parse in zip(batch, parsed):
             try:
-                df = parser.parse_rawdata(filepath)
+                df = parse()
                 if df is not None and not df.empty:
                     dfs.append(df)
                     file_row_counts[filepath] = len(df)
                     parsed_files.append(filepath)
+                    pending_rows += len(df)
                 else:
                     failed_files.append(filepath)
             except Exception:
                 logger.exception("Failed to parse %s, quarantining", filepath.name)
                 failed_files.append(filepath)
+            if max_batch_rows and pending_rows >= max_batch_rows:
+                # Write what is held so far rather than growing the frame.
+                _write(batch_num, dfs, parsed_files, file_row_counts)
+                dfs, parsed_files, file_row_counts = [], [], {}
+                pending_rows = 0
+                written_early = True
 
         for filepath in failed_files:
             if filepath.exists():
@@ -182,34 +362,93 @@ def process_rawdata_files_batch(
                 error_message="Parse error during batch processing",
             )
 
-        if not dfs:
+        if dfs:
+            _write(batch_num, dfs, parsed_files, file_row_counts)
+        elif not written_early:
             logger.info("Batch %d: no parseable files, skipping write", batch_num)
-            continue
 
-        combined = pd.concat(dfs, ignore_index=True)
+
+def classify_file(filepath: Path, parser: ParserBundle) -> Optional[str]:
+    """Return ``'json'``, ``'metadata'``, ``'rawdata'`` or None (unsupported).
+
+    JSON payloads are recognised by suffix and always go to the api_json
+    parser; other files are classified by *parser*'s filename rules.
+    """
+    if filepath.suffix.lower() == ".json":
+        return "json"
+    name = filepath.name.lower()
+    if parser.is_metadata_file(name):
+        return "metadata"
+    if parser.is_rawdata_file(name):
+        return "rawdata"
+    return None
+
+
+def _process_individually(filepaths, db_writer, file_manager, logger, parser):
+    """Run `process_cml_file` on each file still present, swallowing errors."""
+    for filepath in filepaths:
+        if not filepath.exists():
+            continue
         try:
-            db_writer.connect()
-            rows = db_writer.write_rawdata(combined)
-            logger.info(
-                "Batch %d/%d: wrote %d rows from %d files",
-                batch_num,
-                -(-total // batch_size),
-                rows,
-                len(parsed_files),
-            )
-            for filepath in parsed_files:
-                file_manager.archive_file(filepath)
-                db_writer.log_file_event(
-                    filepath.name,
-                    "archived",
-                    rows_written=file_row_counts.get(filepath),
-                )
+            process_cml_file(filepath, db_writer, file_manager, logger, parser=parser)
         except Exception:
-            logger.exception(
-                "Batch %d write failed; %d files remain in incoming for retry",
-                batch_num,
-                len(parsed_files),
-            )
+            pass
+
+
+def process_files_batch(
+    filepaths: List[Path],
+    db_writer,
+    file_manager,
+    logger=None,
+    parser: Optional[ParserBundle] = None,
+    parse_executor: Optional[Executor] = None,
+    parse_ahead: int = 1 + PARSE_AHEAD_EXTRA,
+) -> None:
+    """Process a micro-batch of newly detected files.
+
+    Metadata and rawdata files are each written with one transaction, falling
+    back to per-file processing if that write fails.  JSON payloads and
+    unsupported files go through `process_cml_file` individually.  Files
+    that vanished since they were queued (e.g. duplicate events for an
+    already archived file) are skipped.  `parse_executor` and `parse_ahead`
+    are passed on to `process_rawdata_files_batch`.
+    """
+    if logger is None:
+        logger = logging.getLogger("parser.logic")
+    if parser is None:
+        parser = _make_default_bundle()
+
+    metadata_files: List[Path] = []
+    rawdata_files: List[Path] = []
+    other_files: List[Path] = []
+    groups = {"metadata": metadata_files, "rawdata": rawdata_files}
+    for filepath in dict.fromkeys(filepaths):
+        if not filepath.exists():
+            continue
+        groups.get(classify_file(filepath, parser), other_files).append(filepath)
+
+    # Metadata first so references from rawdata in the same batch resolve.
+    if metadata_files:
+        process_metadata_files_batch(
+            metadata_files,
+            db_writer,
+            file_manager,
+            logger,
+            parser=parser,
+            fallback_to_single=True,
+        )
+    if rawdata_files:
+        process_rawdata_files_batch(
+            rawdata_files,
+            db_writer,
+            file_manager,
+            logger,
+            parser=parser,
+            fallback_to_single=True,
+            parse_executor=parse_executor,
+            parse_ahead=parse_ahead,
+        )
+    _process_individually(other_files, db_writer, file_manager, logger, parser)
 
 
 def process_cml_file(
@@ -238,8 +477,10 @@ def process_cml_file(
     if parser is None:
         parser = _make_default_bundle()
     logger.info(f"Processing file: {filepath}")
-    name = filepath.name.lower()
+    kind = classify_file(filepath, parser)
     try:
+        # No-op while the long-lived connection is open; only reconnects
+        # after the server dropped it.
         db_writer.connect()
     except Exception as e:
         logger.exception("Failed to connect to DB")
@@ -249,21 +490,21 @@ def process_cml_file(
         raise
 
     try:
-        if filepath.suffix.lower() == ".json":
+        if kind == "json":
             df = parse_api_json_raw(filepath)
             rows = db_writer.write_rawdata(df)
             logger.info(f"Wrote {rows} data rows from {filepath.name}")
             file_manager.archive_file(filepath)
             db_writer.log_file_event(filepath.name, "archived", rows_written=rows)
             return "rawdata"
-        elif parser.is_metadata_file(name):
+        elif kind == "metadata":
             df = parser.parse_metadata(filepath)
             rows = db_writer.write_metadata(df)
             logger.info(f"Wrote {rows} metadata rows from {filepath.name}")
             file_manager.archive_file(filepath)
             db_writer.log_file_event(filepath.name, "archived", rows_written=rows)
             return "metadata"
-        elif parser.is_rawdata_file(name):
+        elif kind == "rawdata":
             df = parser.parse_rawdata(filepath)
             try:
                 ok, missing = db_writer.validate_rawdata_references(df)
@@ -271,7 +512,8 @@ def process_cml_file(
                 ok, missing = True, []
             rows = db_writer.write_rawdata(df)
             if not ok and missing:
-                sample = missing[:10]
+                # Sorting only the logged sample keeps large misses cheap.
+                sample = heapq.nsmallest(10, missing)
                 logger.warning(
                     "Missing metadata for %d (cml_id, sublink_id) pairs; sample: %s",
                     len(missing),
@@ -8,7 +8,6 @@ from ..parsers.csv_generic.parse_raw import parse_rawdata_csv
 from ..parsers.csv_generic.parse_metadata import parse_metadata_csv
 from ..validate_dataframe import validate_dataframe
 
-
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -260,3 +259,28 @@ def test_load_parser_csv_generic_custom_meta_keyword(tmp_path):
     bundle = load_parser("csv_generic", config)
     assert bundle.is_metadata_file("station_info_2026.csv")
     assert not bundle.is_metadata_file("meta_something.csv")
+
+
+def test_load_parser_csv_generic_keywords_are_case_insensitive():
+    from ..service_logic import load_parser
+
+    config = {
+        "metadata_filename_keyword": "Station_Info",
+        "rawdata_filename_keyword": "RAW",
+    }
+    bundle = load_parser("csv_generic", config)
+    assert bundle.is_metadata_file("STATION_INFO_2026.csv")
+    assert bundle.is_rawdata_file("cml_raw_2026.csv")
+    assert not bundle.is_rawdata_file("station_info_2026.csv")
+
+
+def test_load_parser_csv_generic_parsers_are_picklable():
+    """Process pools need to pickle the bundle's parse functions."""
+    import pickle
+
+    from ..service_logic import load_parser
+
+    bundle = load_parser("csv_generic", {"read_csv_kwargs": {"sep": ";"}})
+    parse_raw = pickle.loads(pickle.dumps(bundle.parse_rawdata))
+    assert parse_raw.keywords == {"config": {"read_csv_kwargs": {"sep": ";"}}}
+    pickle.dumps(bundle.parse_metadata)
@@ -3,12 +3,14 @@
 import pytest
 import pandas as pd
 from unittest.mock import Mock, patch, MagicMock
+import struct
 import sys
 
 # Skip all tests if psycopg2 not available
 psycopg2 = pytest.importorskip("psycopg2", reason="psycopg2 not installed")
 
-from ..db_writer import DBWriter
+from ..db_writer import DBWriter, DEFAULT_COPY_BUFFER_SIZE
+from .test_pg_binary_copy import _read_tuples
 
 
 @pytest.fixture
@@ -66,6 +68,35 @@ def test_dbwriter_connect_all_retries_fail():
             assert mock_connect.call_count == 3  # max_retries
 
 
+def test_wait_for_db_backs_off_until_connected():
+    with patch("parser.db_writer.psycopg2.connect") as mock_connect:
+        mock_connect.side_effect = [
+            psycopg2.OperationalError("starting up"),
+            psycopg2.OperationalError("starting up"),
+            Mock(),
+        ]
+
+        with patch("parser.db_writer.time.sleep") as mock_sleep:
+            writer = DBWriter("postgresql://test")
+            assert writer.wait_for_db(timeout=30, initial_delay=0.1) is True
+
+    assert writer.is_connected()
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [0.1, 0.2]
+
+
+def test_wait_for_db_gives_up_after_timeout():
+    with patch(
+        "parser.db_writer.psycopg2.connect",
+        side_effect=psycopg2.OperationalError("down"),
+    ), patch("parser.db_writer.time.sleep"), patch(
+        "parser.db_writer.time.monotonic", side_effect=[0.0, 1.0, 31.0]
+    ):
+        writer = DBWriter("postgresql://test")
+        assert writer.wait_for_db(timeout=30) is False
+
+    assert writer.conn is None
+
+
 def test_dbwriter_already_connected_skips_reconnect():
     """Test that connect() does nothing if already connected."""
     with patch("parser.db_writer.psycopg2.connect") as mock_connect:
@@ -131,12 +162,20 @@ def test_write_metadata_success(mock_connection):
         }
     )
 
-    with patch("parser.db_writer.psycopg2.extras.execute_values") as mock_exec:
-        result = writer.write_metadata(df)
+    result = writer.write_metadata(df)
 
-        assert result == 2
-        mock_exec.assert_called_once()
-        mock_connection.commit.assert_called_once()
+    assert result == 2
+    cur = mock_connection.cursor.return_value
+    cur.copy_expert.assert_called_once()
+    copy_sql, buf = cur.copy_expert.call_args[0]
+    assert copy_sql.startswith("COPY _stage_cml_metadata")
+    assert copy_sql.endswith("WITH (FORMAT BINARY)")
+    first = _read_tuples(buf.getvalue())[0]
+    assert first[:3] == [b"123", b"sublink_1", struct.pack("!f", 13.4)]
+    merge_sql = cur.execute.call_args_list[-1][0][0]
+    assert "INSERT INTO cml_metadata" in merge_sql
+    assert "ON CONFLICT (cml_id, sublink_id, user_id) DO UPDATE" in merge_sql
+    mock_connection.commit.assert_called_once()
 
 
 def test_write_rawdata_success(mock_connection):
@@ -154,12 +193,21 @@ def test_write_rawdata_success(mock_connection):
         }
     )
 
-    with patch("parser.db_writer.psycopg2.extras.execute_values") as mock_exec:
-        result = writer.write_rawdata(df)
+    result = writer.write_rawdata(df)
 
-        assert result == 2
-        mock_exec.assert_called_once()
-        mock_connection.commit.assert_called_once()
+    assert result == 2
+    cur = mock_connection.cursor.return_value
+    cur.copy_expert.assert_called_once()
+    copy_sql, buf = cur.copy_expert.call_args[0]
+    assert copy_sql.startswith("COPY _stage_cml_data")
+    assert copy_sql.endswith("(FORMAT BINARY)")
+    assert cur.copy_expert.call_args.kwargs["size"] == DEFAULT_COPY_BUFFER_SIZE
+    assert buf.getvalue().startswith(b"PGCOPY\n\xff\r\n\x00")
+    executed = [c[0][0] for c in cur.execute.call_args_list]
+    assert any(
+        "INSERT INTO cml_data" in sql and "DO NOTHING" in sql for sql in executed
+    )
+    mock_connection.commit.assert_called_once()
 
 
 def test_write_rawdata_with_nan_sublink(mock_connection):
@@ -177,9 +225,8 @@ def test_write_rawdata_with_nan_sublink(mock_connection):
         }
     )
 
-    with patch("parser.db_writer.psycopg2.extras.execute_values") as mock_exec:
-        result = writer.write_rawdata(df)
-        assert result == 1
+    result = writer.write_rawdata(df)
+    assert result == 1
 
 
 def test_validate_rawdata_references_empty():
@@ -236,8 +283,8 @@ def test_close_already_closed():
     assert writer.conn is None
 
 
-def test_write_rawdata_execute_values_failure_triggers_rollback(mock_connection):
-    """When execute_values raises, write_rawdata should rollback and propagate."""
+def test_write_rawdata_copy_failure_triggers_rollback(mock_connection):
+    """When COPY raises, write_rawdata should rollback and propagate."""
     writer = DBWriter("postgresql://test")
     writer.conn = mock_connection
 
@@ -251,19 +298,16 @@ def test_write_rawdata_execute_values_failure_triggers_rollback(mock_connection)
         }
     )
 
-    with patch(
-        "parser.db_writer.psycopg2.extras.execute_values",
-        side_effect=Exception("DB error"),
-    ):
-        with pytest.raises(Exception, match="DB error"):
-            writer.write_rawdata(df)
+    mock_connection.cursor.return_value.copy_expert.side_effect = Exception("DB error")
+    with pytest.raises(Exception, match="DB error"):
+        writer.write_rawdata(df)
 
     # rollback should have been called by the error handler
     mock_connection.rollback.assert_called()
 
 
-def test_write_metadata_execute_values_failure_triggers_rollback(mock_connection):
-    """When execute_values raises during metadata write, rollback is performed."""
+def test_write_metadata_copy_failure_triggers_rollback(mock_connection):
+    """When COPY raises during metadata write, rollback is performed."""
     writer = DBWriter("postgresql://test")
     writer.conn = mock_connection
 
@@ -281,18 +325,17 @@ def test_write_metadata_execute_values_failure_triggers_rollback(mock_connection
         }
     )
 
-    with patch(
-        "parser.db_writer.psycopg2.extras.execute_values",
-        side_effect=Exception("meta error"),
-    ):
-        with pytest.raises(Exception, match="meta error"):
-            writer.write_metadata(df)
+    mock_connection.cursor.return_value.copy_expert.side_effect = Exception(
+        "meta error"
+    )
+    with pytest.raises(Exception, match="meta error"):
+        writer.write_metadata(df)
 
     mock_connection.rollback.assert_called()
 
 
 def test__update_stats_for_cmls_executes_queries_without_commit(mock_connection):
-    """Ensure _update_stats_for_cmls executes update function per CML and does not commit."""
+    """Ensure _update_stats_for_cmls updates all CMLs in one statement and does not commit."""
     writer = DBWriter("postgresql://test")
     writer.conn = mock_connection
 
@@ -300,7 +343,8 @@ def test__update_stats_for_cmls_executes_queries_without_commit(mock_connection)
     writer._update_stats_for_cmls(cml_ids)
 
     cur = mock_connection.cursor.return_value
-    assert cur.execute.call_count == len(cml_ids)
+    cur.execute.assert_called_once()
+    assert cur.execute.call_args[0][1] == ("demo_openmrg", cml_ids)
     # commit should not be called by the helper
     mock_connection.commit.assert_not_called()
 
@@ -414,3 +458,266 @@ def test_log_file_event_skips_when_connect_fails():
         with patch("parser.db_writer.time.sleep"):
             writer = DBWriter("postgresql://test")
             writer.log_file_event("file.csv", "archived")  # must not raise
+
+
+def test_write_rawdata_casts_numeric_ids_to_text(mock_connection):
+    """Integer cml_ids are written and used for stats as strings."""
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+
+    df = pd.DataFrame(
+        {
+            "time": pd.to_datetime(["2026-01-22 10:00:00"]),
+            "cml_id": [123],
+            "sublink_id": ["A"],
+            "rsl": [-45.0],
+            "tsl": [1.0],
+        }
+    )
+
+    assert writer.write_rawdata(df) == 1
+    cur = mock_connection.cursor.return_value
+    _, buf = cur.copy_expert.call_args[0]
+    assert b"\x00\x00\x00\x03123" in buf.getvalue()
+    cur.execute.assert_any_call(
+        "SELECT update_cml_stats(c, %s) FROM unnest(%s::text[]) AS c",
+        ("demo_openmrg", ["123"]),
+    )
+
+
+def test_metadata_ids_are_cached_between_validations(mock_connection):
+    """A second validation with known pairs does not query cml_metadata again."""
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    cursor = mock_connection.cursor.return_value
+    cursor.fetchall.return_value = [("123", "A")]
+    df = pd.DataFrame({"cml_id": ["123"], "sublink_id": ["A"]})
+
+    assert writer.validate_rawdata_references(df) == (True, [])
+    assert writer.validate_rawdata_references(df) == (True, [])
+    assert cursor.execute.call_count == 1
+
+    writer.close()
+    assert writer._metadata_ids_cache is None
+
+
+def test_validation_miss_refreshes_cached_metadata_ids(mock_connection):
+    """Pairs missing from the cache are looked up in one query."""
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    cursor = mock_connection.cursor.return_value
+    cursor.fetchall.side_effect = [[("123", "A")], [("123", "A"), ("456", "B")]]
+
+    writer.get_existing_metadata_ids()
+    df = pd.DataFrame({"cml_id": ["456"], "sublink_id": ["B"]})
+
+    assert writer.validate_rawdata_references(df) == (True, [])
+    assert cursor.fetchall.call_count == 2
+
+
+def test_validation_looks_up_only_unknown_pairs(mock_connection):
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    writer._metadata_ids_cache = {("123", "A")}
+    cursor = mock_connection.cursor.return_value
+    cursor.fetchall.return_value = []
+    df = pd.DataFrame({"cml_id": ["123", "456"], "sublink_id": ["A", "B"]})
+
+    assert writer.validate_rawdata_references(df) == (False, [("456", "B")])
+    cursor.execute.assert_called_once()
+    assert cursor.execute.call_args[0][1] == ("demo_openmrg", ["456"], ["B"])
+
+
+def test_write_metadata_extends_cached_ids(mock_connection):
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    writer._metadata_ids_cache = {("123", "A")}
+    df = pd.DataFrame(
+        {
+            "cml_id": [456],
+            "sublink_id": ["B"],
+            "site_0_lon": [13.4],
+            "site_0_lat": [52.5],
+            "site_1_lon": [13.5],
+            "site_1_lat": [52.6],
+            "frequency": [38000.0],
+            "polarization": ["H"],
+            "length": [1.2],
+        }
+    )
+
+    writer.write_metadata(df)
+
+    assert writer._metadata_ids_cache == {("123", "A"), ("456", "B")}
+
+
+def test_write_rawdata_reuses_cursor_across_batches(mock_connection):
+    """The write cursor is opened once per connection, not per batch."""
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    cursor = mock_connection.cursor.return_value
+    cursor.closed = False
+    cursor.connection = mock_connection
+    df = pd.DataFrame(
+        {
+            "time": pd.to_datetime(["2026-01-22 10:00:00"]),
+            "cml_id": ["123"],
+            "sublink_id": ["A"],
+            "rsl": [-45.0],
+            "tsl": [1.0],
+        }
+    )
+
+    writer.write_rawdata(df)
+    writer.write_rawdata(df)
+
+    assert mock_connection.cursor.call_count == 1
+    cursor.close.assert_not_called()
+
+
+def test_write_metadata_drops_duplicate_keys(mock_connection):
+    """Only the last row for a (cml_id, sublink_id) pair is sent."""
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    df = pd.DataFrame(
+        {
+            "cml_id": ["123", "123"],
+            "sublink_id": ["A", "A"],
+            "site_0_lon": [13.0, 14.0],
+            "site_0_lat": [52.5, 52.5],
+            "site_1_lon": [13.5, 13.5],
+            "site_1_lat": [52.6, 52.6],
+            "frequency": [38000.0, 38000.0],
+            "polarization": ["H", "H"],
+            "length": [1.2, 1.2],
+        }
+    )
+
+    assert writer.write_metadata(df) == 1
+    _, buf = mock_connection.cursor.return_value.copy_expert.call_args[0]
+    rows = _read_tuples(buf.getvalue())
+    assert len(rows) == 1
+    assert rows[0][2] == struct.pack("!f", 14.0)
+    assert rows[0][-1] == b"demo_openmrg"
+
+
+def test_connect_enables_tcp_keepalives():
+    with patch("parser.db_writer.psycopg2.connect") as mock_connect:
+        writer = DBWriter("postgresql://test", connect_timeout=5)
+        writer.connect()
+
+    mock_connect.assert_called_once_with(
+        "postgresql://test",
+        connect_timeout=5,
+        keepalives=1,
+        keepalives_idle=30,
+        keepalives_interval=10,
+        keepalives_count=3,
+    )
+
+
+def test_connect_passes_synchronous_commit_option():
+    with patch("parser.db_writer.psycopg2.connect") as mock_connect:
+        DBWriter("postgresql://test", synchronous_commit="off").connect()
+
+    assert mock_connect.call_args.kwargs["options"] == "-c synchronous_commit=off"
+
+
+def test_write_rawdata_arrays_accepts_numpy_columns(mock_connection):
+    """Plain NumPy columns are written without building a DataFrame."""
+    import numpy as np
+
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+
+    result = writer.write_rawdata_arrays(
+        np.array(
+            ["2026-01-22T10:00:00", "2026-01-22T10:01:00"], dtype="datetime64[ns]"
+        ),
+        np.array(["123", "456"], dtype=object),
+        np.array(["A", np.nan], dtype=object),
+        np.array([-45.0, np.nan]),
+        np.array([1.0, 2.0]),
+    )
+
+    assert result == 2
+    cur = mock_connection.cursor.return_value
+    copy_sql, buf = cur.copy_expert.call_args[0]
+    assert copy_sql.startswith(
+        "COPY _stage_cml_data (time, cml_id, sublink_id, rsl, tsl, user_id)"
+    )
+    payload = buf.getvalue()
+    # The NaN sublink id and rsl are sent as NULLs (length -1)
+    assert payload.count(b"\xff\xff\xff\xff") == 2
+    mock_connection.commit.assert_called_once()
+
+
+def test_staging_table_created_once_per_connection(mock_connection):
+    """CREATE TEMP TABLE runs only until the first committed batch."""
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    cursor = mock_connection.cursor.return_value
+    cursor.closed = False
+    cursor.connection = mock_connection
+    df = pd.DataFrame(
+        {
+            "time": pd.to_datetime(["2026-01-22 10:00:00"]),
+            "cml_id": ["123"],
+            "sublink_id": ["A"],
+            "rsl": [-45.0],
+            "tsl": [1.0],
+        }
+    )
+
+    writer.write_rawdata(df)
+    writer.write_rawdata(df)
+
+    creates = [
+        c for c in cursor.execute.call_args_list if "CREATE TEMP TABLE" in c[0][0]
+    ]
+    assert len(creates) == 1
+
+
+def test_connect_replaces_closed_connection():
+    """A connection closed by the server is replaced on the next connect()."""
+    with patch("parser.db_writer.psycopg2.connect") as mock_connect:
+        stale, fresh = Mock(closed=0), Mock(closed=0)
+        mock_connect.side_effect = [stale, fresh]
+
+        writer = DBWriter("postgresql://test")
+        writer.connect()
+        stale.closed = 2
+        writer.connect()
+
+        assert writer.conn is fresh
+        assert mock_connect.call_count == 2
+
+
+def test_write_rawdata_reads_ids_from_index_levels(mock_connection):
+    """A (time, cml_id, sublink_id)-indexed frame is written without reset_index."""
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    index = pd.MultiIndex.from_arrays(
+        [pd.to_datetime(["2026-01-22 10:00:00"]), ["123"], ["A"]],
+        names=["time", "cml_id", "sublink_id"],
+    )
+    df = pd.DataFrame({"rsl": [-45.0], "tsl": [1.0]}, index=index)
+
+    with patch.object(writer, "write_rawdata_arrays", return_value=1) as write:
+        assert writer.write_rawdata(df) == 1
+
+    time, cml_id, sublink_id, rsl, tsl = write.call_args[0]
+    assert list(cml_id) == ["123"] and list(sublink_id) == ["A"]
+    assert list(rsl) == [-45.0]
+
+
+def test_validation_reports_repeated_pairs_once(mock_connection):
+    writer = DBWriter("postgresql://test")
+    writer.conn = mock_connection
+    writer._metadata_ids_cache = set()
+    cursor = mock_connection.cursor.return_value
+    cursor.fetchall.return_value = []
+    df = pd.DataFrame({"cml_id": [456, 456, 456], "sublink_id": ["B", "B", "B"]})
+
+    assert writer.validate_rawdata_references(df) == (False, [("456", "B")])
+    assert cursor.execute.call_args[0][1] == ("demo_openmrg", ["456"], ["B"])
@@ -1,6 +1,7 @@
 """Tests for demo_csv_data parser functions and validation."""
 
 import pandas as pd
+import pytest
 from pathlib import Path
 from ..parsers.demo_csv_data.parse_raw import parse_rawdata_csv
 from ..parsers.demo_csv_data.parse_metadata import parse_metadata_csv
@@ -47,3 +48,91 @@ def test_validate_dataframe_invalid():
     df = pd.DataFrame({"foo": [1, 2]})
     assert not validate_dataframe(df, "rawdata")
     assert not validate_dataframe(df, "metadata")
+
+
+def test_parse_rawdata_csv_zstd(tmp_path):
+    """zstd-compressed uploads (*.csv.zst) are decompressed transparently."""
+    zstandard = pytest.importorskip("zstandard")
+    csv = tmp_path / "cml_data_1.csv.zst"
+    csv.write_bytes(
+        zstandard.ZstdCompressor().compress(
+            b"time,cml_id,sublink_id,tsl,rsl\n"
+            b"2026-01-22 10:00:00,10001,sublink_1,1.0,-46.0\n"
+        )
+    )
+    df = parse_rawdata_csv(csv)
+    assert df.shape[0] == 1
+    assert validate_dataframe(df, "rawdata")
+
+
+def test_parse_metadata_csv_dtypes(tmp_path):
+    """Ids are read as text verbatim and bad coordinates become NaN."""
+    csv = tmp_path / "meta.csv"
+    csv.write_text(
+        "cml_id,sublink_id,site_0_lon,site_0_lat,site_1_lon,site_1_lat,frequency,polarization,length\n"
+        "00101,1,13.4,52.5,bad,52.6,18.0,H,2.1\n"
+    )
+    df = parse_metadata_csv(csv)
+    assert df.loc[0, "cml_id"] == "00101"
+    assert df.loc[0, "sublink_id"] == "1"
+    assert pd.isna(df.loc[0, "site_1_lon"])
+    assert df["site_0_lon"].dtype == "float64"
+
+
+def test_parse_metadata_csv_blank_polarization_is_nan(tmp_path):
+    csv = tmp_path / "meta.csv"
+    csv.write_text(
+        "cml_id,sublink_id,site_0_lon,site_0_lat,site_1_lon,site_1_lat,frequency,polarization,length\n"
+        "10001,sublink_1,13.4,52.5,13.5,52.6,18.0,,2.1\n"
+        "10001,sublink_2,13.4,52.5,13.5,52.6,18.0,H,2.1\n"
+    )
+    df = parse_metadata_csv(csv)
+    assert pd.isna(df.loc[0, "polarization"])
+    assert df.loc[1, "polarization"] == "H"
+
+
+def test_parse_rawdata_csv_dtypes(tmp_path):
+    """Ids stay verbatim, like metadata ids; bad values become NaT/NaN."""
+    csv = tmp_path / "raw.csv"
+    csv.write_text(
+        "time,cml_id,sublink_id,tsl,rsl\n"
+        "2026-01-22 10:00:00,00101,1,1.0,-46.0\n"
+        "bad,,sublink_2,x,-45.5\n"
+    )
+    df = parse_rawdata_csv(csv)
+    assert list(df["cml_id"]) == ["00101", "nan"]
+    assert df.loc[0, "sublink_id"] == "1"
+    assert pd.isna(df.loc[1, "time"])
+    assert pd.isna(df.loc[1, "tsl"])
+    assert df["rsl"].dtype == "float64"
+
+
+def test_validate_dataframe_metadata_coordinate_ranges():
+    df = pd.DataFrame(
+        {
+            "cml_id": ["1", "2"],
+            "sublink_id": ["A", "A"],
+            "site_0_lon": [13.4, 13.5],
+            "site_0_lat": [52.5, 52.6],
+            "site_1_lon": [float("nan")] * 2,
+            "site_1_lat": [float("nan")] * 2,
+            "frequency": [18.0, 18.0],
+            "polarization": ["H", "V"],
+            "length": [2.1, 2.2],
+        }
+    )
+    # A column that is entirely missing is accepted.
+    assert validate_dataframe(df, "metadata")
+    assert not validate_dataframe(df.assign(site_0_lon=[13.4, 181.0]), "metadata")
+    assert not validate_dataframe(df.assign(site_1_lat=[-91.0, 0.0]), "metadata")
+
+
+def test_parse_rawdata_csv_skips_extra_columns(tmp_path):
+    csv = tmp_path / "raw.csv"
+    csv.write_text(
+        "note,time,cml_id,sublink_id,tsl,rsl,quality\n"
+        "x,2026-01-22 10:00:00,10001,sublink_1,1.0,-46.0,good\n"
+    )
+    df = parse_rawdata_csv(csv)
+    assert list(df.columns) == ["time", "cml_id", "sublink_id", "tsl", "rsl"]
+    assert validate_dataframe(df, "rawdata")
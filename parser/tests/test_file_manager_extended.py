@@ -1,6 +1,7 @@
 """Extended tests for FileManager edge cases."""
 
 from pathlib import Path
+import errno
 import pytest
 from unittest.mock import patch, Mock
 from ..file_manager import FileManager
@@ -40,13 +41,14 @@ def test_safe_move_fallback_to_copy(tmp_path):
     f.write_text("data")
 
     # _safe_move is used by quarantine_file; verify fallback via that path
-    with patch("parser.file_manager.shutil.move") as mock_move:
-        mock_move.side_effect = OSError("Cross-device link")
+    with patch("parser.file_manager.os.replace") as mock_move:
+        mock_move.side_effect = OSError(errno.EXDEV, "Cross-device link")
 
         dest = fm.quarantine_file(f, "parse error")
 
-        # File should have been copied since move failed
+        # File should have been copied since move failed, then removed
         assert (quarantine / "test.csv").exists()
+        assert not f.exists()
         mock_move.assert_called_once()
 
 
@@ -61,9 +63,9 @@ def test_safe_move_both_fail(tmp_path):
     f = incoming / "test.csv"
     f.write_text("data")
 
-    with patch("parser.file_manager.shutil.move") as mock_move:
+    with patch("parser.file_manager.os.replace") as mock_move:
         with patch("parser.file_manager.shutil.copy2") as mock_copy:
-            mock_move.side_effect = OSError("Move failed")
+            mock_move.side_effect = OSError(errno.EXDEV, "Move failed")
             mock_copy.side_effect = OSError("Copy failed")
 
             # quarantine_file falls back to an orphan note rather than raising
@@ -82,9 +84,9 @@ def test_quarantine_creates_orphan_on_move_copy_failure(tmp_path):
     f = incoming / "test.csv"
     f.write_text("data")
 
-    with patch("parser.file_manager.shutil.move") as mock_move:
+    with patch("parser.file_manager.os.replace") as mock_move:
         with patch("parser.file_manager.shutil.copy2") as mock_copy:
-            mock_move.side_effect = OSError("Move failed")
+            mock_move.side_effect = OSError(errno.EXDEV, "Move failed")
             mock_copy.side_effect = OSError("Copy failed")
 
             result = fm.quarantine_file(f, "Parse error")
@@ -102,6 +104,21 @@ def test_get_archived_path(tmp_path):
 
     assert "test.csv.gz" in str(path)
     assert not path.exists()  # File not actually moved
+    assert fm.get_archived_path(Path("test.csv.zst")).name == "test.csv.zst"
+
+
+def test_archive_moves_compressed_file_unchanged(tmp_path):
+    """A .zst upload is archived as is, not gzipped a second time."""
+    fm = FileManager(str(tmp_path / "in"), str(tmp_path / "arch"), str(tmp_path / "q"))
+    f = tmp_path / "in" / "data.csv.zst"
+    f.write_bytes(b"\x28\xb5\x2f\xfd compressed")
+
+    dest = fm.archive_file(f)
+
+    assert dest == fm.get_archived_path(f)
+    assert dest.name == "data.csv.zst"
+    assert dest.read_bytes() == b"\x28\xb5\x2f\xfd compressed"
+    assert not f.exists()
 
 
 def test_quarantine_error_note_contains_timestamp(tmp_path):
@@ -123,3 +140,48 @@ def test_quarantine_error_note_contains_timestamp(tmp_path):
     assert "Quarantined at:" in content
     assert "Test error message" in content
     assert str(f) in content
+
+
+def test_archive_subdir_is_created_once_per_day(tmp_path):
+    """Repeated archives on the same day reuse the cached subdirectory."""
+    fm = FileManager(str(tmp_path / "in"), str(tmp_path / "arch"), str(tmp_path / "q"))
+
+    first = fm._archive_subdir()
+    assert first.is_dir()
+
+    with patch.object(Path, "mkdir") as mock_mkdir:
+        assert fm._archive_subdir() == first
+        mock_mkdir.assert_not_called()
+
+
+def test_archive_recreates_removed_day_directory(tmp_path):
+    """Archiving still works after the cached day directory is deleted."""
+    import shutil
+
+    fm = FileManager(str(tmp_path / "in"), str(tmp_path / "arch"), str(tmp_path / "q"))
+    subdir = fm._archive_subdir()
+
+    for name in ("data.csv", "data.csv.zst"):
+        shutil.rmtree(subdir)
+        f = tmp_path / "in" / name
+        f.write_bytes(b"payload")
+
+        dest = fm.archive_file(f)
+
+        assert dest.parent == subdir
+        assert dest.exists()
+        assert not f.exists()
+
+
+def test_safe_move_other_errors_do_not_copy(tmp_path):
+    """Errors other than cross-device/permission fail without copying."""
+    fm = FileManager(str(tmp_path / "in"), str(tmp_path / "arch"), str(tmp_path / "q"))
+    f = tmp_path / "in" / "test.csv"
+    f.write_text("data")
+
+    with patch("parser.file_manager.os.replace") as mock_move:
+        with patch("parser.file_manager.shutil.copy2") as mock_copy:
+            mock_move.side_effect = OSError(errno.ENOSPC, "No space left")
+
+            assert fm._safe_move(f, tmp_path / "q" / "test.csv") is False
+            mock_copy.assert_not_called()
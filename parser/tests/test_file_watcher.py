@@ -2,6 +2,8 @@
 
 import tempfile
 import shutil
+import sys
+import threading
 import time
 from pathlib import Path
 import pytest
@@ -15,7 +17,7 @@ def test_fileuploadhandler_triggers_callback(tmp_path):
     def cb(filepath):
         called["path"] = filepath
 
-    handler = FileUploadHandler(cb, [".csv"])
+    handler = FileUploadHandler(cb, [".csv"], use_close_events=False)
     # Simulate file creation event
     test_file = tmp_path / "test.csv"
     test_file.write_text("dummy")
@@ -44,9 +46,113 @@ def test_fileuploadhandler_ignores_unsupported(tmp_path):
         nonlocal called
         called = True
 
-    handler = FileUploadHandler(cb, [".csv"])
+    handler = FileUploadHandler(cb, [".csv"], use_close_events=False)
     test_file = tmp_path / "test.txt"
     test_file.write_text("dummy")
     event = type("FakeEvent", (), {"is_directory": False, "src_path": str(test_file)})()
     handler.on_created(event)
     assert not called
+
+
+def test_fileuploadhandler_close_event_triggers_callback(tmp_path):
+    """With close events, on_closed dispatches and on_created is ignored."""
+    called = []
+    handler = FileUploadHandler(called.append, [".csv"], use_close_events=True)
+    test_file = tmp_path / "test.csv"
+    test_file.write_text("dummy")
+    event = type("FakeEvent", (), {"is_directory": False, "src_path": str(test_file)})()
+
+    handler.on_created(event)
+    assert called == []
+
+    handler.on_closed(event)
+    assert called == [test_file]
+
+
+@pytest.mark.skipif(
+    not sys.platform.startswith("linux"), reason="close events need inotify"
+)
+def test_filewatcher_dispatches_on_close_write(tmp_path):
+    """A file written into the watched directory reaches the callback."""
+    seen = threading.Event()
+    watcher = FileWatcher(str(tmp_path), lambda p: seen.set(), [".csv"])
+    watcher.start()
+    try:
+        (tmp_path / "data.csv").write_text("time,cml_id\n")
+        assert seen.wait(timeout=5)
+    finally:
+        watcher.stop()
+
+
+def test_fileuploadhandler_moved_file_triggers_callback(tmp_path):
+    """A temp file renamed to a supported name is dispatched by its new name."""
+    called = []
+    handler = FileUploadHandler(called.append, [".csv"], use_close_events=True)
+    final = tmp_path / "data.csv"
+    event = type(
+        "FakeEvent",
+        (),
+        {
+            "is_directory": False,
+            "src_path": str(tmp_path / "data.csv.tmp"),
+            "dest_path": str(final),
+        },
+    )()
+
+    handler.on_moved(event)
+    assert called == [final]
+
+
+def test_fileuploadhandler_runs_callback_on_executor(tmp_path):
+    """With an executor, callbacks run on a worker thread, not the caller's."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    threads = []
+    done = threading.Event()
+
+    def cb(filepath):
+        threads.append(threading.get_ident())
+        done.set()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        handler = FileUploadHandler(
+            cb, [".csv"], use_close_events=True, executor=executor
+        )
+        test_file = tmp_path / "test.csv"
+        test_file.write_text("dummy")
+        event = type(
+            "FakeEvent", (), {"is_directory": False, "src_path": str(test_file)}
+        )()
+        handler.on_closed(event)
+        assert done.wait(timeout=5)
+
+    assert threads and threads[0] != threading.get_ident()
+    assert handler.processing == set()
+
+
+def test_filewatcher_normalises_extensions_to_frozenset(tmp_path):
+    watcher = FileWatcher(str(tmp_path), lambda p: None, [".CSV", ".json"])
+    assert watcher.supported_extensions == frozenset({".csv", ".json"})
+
+
+def test_fileuploadhandler_matches_extensions_case_insensitively(tmp_path):
+    called = []
+    handler = FileUploadHandler(called.append, (".CSV",), use_close_events=True)
+    assert handler.supported_extensions == frozenset({".csv"})
+
+    for name in ("upload.Csv", "notes.txt"):
+        event = type(
+            "FakeEvent", (), {"is_directory": False, "src_path": str(tmp_path / name)}
+        )()
+        handler.on_closed(event)
+
+    assert called == [tmp_path / "upload.Csv"]
+
+
+def test_filewatcher_without_workers_runs_callback_inline(tmp_path):
+    watcher = FileWatcher(str(tmp_path), lambda p: None, [".csv"], max_workers=0)
+    watcher.start()
+    try:
+        assert watcher._executor is None
+    finally:
+        watcher.stop()
@@ -1,12 +1,21 @@
 """Tests for process_existing_files and main() wiring in parser/main.py."""
 
+import os
+import queue
 import threading
 import pytest
 from pathlib import Path
 from unittest.mock import MagicMock, patch, call
 
 
-from ..entrypoints.sftp_push import process_existing_files, main
+from ..entrypoints.sftp_push import (
+    WATCHED_EXTENSIONS,
+    _PendingFiles,
+    _next_batch,
+    process_existing_files,
+    main,
+)
+from ..file_watcher import FileUploadHandler
 
 
 @pytest.fixture
@@ -74,13 +83,54 @@ def test_data_files_only_use_batch_processing(
     assert set(passed_files) == set(files)
 
 
-def test_metadata_files_only_use_individual_processing(
+def test_metadata_files_only_use_metadata_batch(
     tmp_path, mock_db_writer, mock_file_manager, logger
 ):
-    """Metadata files are processed individually via process_cml_file."""
+    """Metadata files are written together via process_metadata_files_batch."""
     meta1 = _write_csv(tmp_path, "metadata_links.csv")
     meta2 = _write_csv(tmp_path, "meta_extra.csv")
 
+    with patch(
+        "parser.entrypoints.sftp_push.process_rawdata_files_batch"
+    ) as mock_batch, patch(
+        "parser.entrypoints.sftp_push.process_metadata_files_batch"
+    ) as mock_meta, patch(
+        "parser.entrypoints.sftp_push.Config.INCOMING_DIR", tmp_path
+    ):
+        process_existing_files(mock_db_writer, mock_file_manager, logger)
+
+    mock_meta.assert_called_once()
+    assert set(mock_meta.call_args[0][0]) == {meta1, meta2}
+    mock_batch.assert_not_called()
+
+
+def test_zstd_compressed_data_files_are_picked_up(
+    tmp_path, mock_db_writer, mock_file_manager, logger
+):
+    """*.csv.zst uploads are included in the startup sweep."""
+    plain = _write_csv(tmp_path, "raw_data_001.csv")
+    compressed = tmp_path / "raw_data_002.csv.zst"
+    compressed.write_bytes(b"")
+
+    with patch(
+        "parser.entrypoints.sftp_push.process_rawdata_files_batch"
+    ) as mock_batch, patch(
+        "parser.entrypoints.sftp_push.Config.INCOMING_DIR", tmp_path
+    ):
+        process_existing_files(mock_db_writer, mock_file_manager, logger)
+
+    passed_files = mock_batch.call_args[0][0]
+    assert set(passed_files) == {plain, compressed}
+
+
+def test_non_csv_zstd_files_are_ignored_by_sweep_and_watcher(
+    tmp_path, mock_db_writer, mock_file_manager, logger
+):
+    """The sweep and the watcher agree that only *.csv.zst is ingested."""
+    compressed = tmp_path / "raw_data_001.csv.zst"
+    for name in (compressed.name, "api_001.json.zst", "blob.zst"):
+        (tmp_path / name).write_bytes(b"")
+
     with patch(
         "parser.entrypoints.sftp_push.process_rawdata_files_batch"
     ) as mock_batch, patch(
@@ -90,14 +140,47 @@ def test_metadata_files_only_use_individual_processing(
     ):
         process_existing_files(mock_db_writer, mock_file_manager, logger)
 
-    assert mock_single.call_count == 2
-    mock_batch.assert_not_called()
+    assert mock_batch.call_args[0][0] == [compressed]
+    mock_single.assert_not_called()
+
+    called = []
+    handler = FileUploadHandler(
+        called.append, WATCHED_EXTENSIONS, use_close_events=True
+    )
+    for path in sorted(tmp_path.iterdir()):
+        event = type("FakeEvent", (), {"is_directory": False, "src_path": str(path)})()
+        handler.on_closed(event)
+
+    assert called == [compressed]
+
+
+def test_directories_and_other_files_are_skipped(
+    tmp_path, mock_db_writer, mock_file_manager, logger
+):
+    """Only regular .csv/.csv.zst/.json files are picked up by the sweep."""
+    data = _write_csv(tmp_path, "raw_data_001.csv")
+    (tmp_path / "nested.csv").mkdir()
+    (tmp_path / "notes.txt").write_text("ignore me")
+    payload = tmp_path / "api_001.json"
+    payload.write_text("{}")
+
+    with patch(
+        "parser.entrypoints.sftp_push.process_rawdata_files_batch"
+    ) as mock_batch, patch(
+        "parser.entrypoints.sftp_push.process_cml_file"
+    ) as mock_single, patch(
+        "parser.entrypoints.sftp_push.Config.INCOMING_DIR", tmp_path
+    ):
+        process_existing_files(mock_db_writer, mock_file_manager, logger)
+
+    assert mock_batch.call_args[0][0] == [data]
+    assert mock_single.call_args[0][0] == payload
 
 
 def test_mixed_files_routes_to_correct_handlers(
     tmp_path, mock_db_writer, mock_file_manager, logger
 ):
-    """Metadata files go to process_cml_file; data files go to the batch function."""
+    """Metadata and data files each go to their batch function."""
     meta = _write_csv(tmp_path, "metadata_links.csv")
     data1 = _write_csv(tmp_path, "raw_data_001.csv")
     data2 = _write_csv(tmp_path, "raw_data_002.csv")
@@ -105,15 +188,15 @@ def test_mixed_files_routes_to_correct_handlers(
     with patch(
         "parser.entrypoints.sftp_push.process_rawdata_files_batch"
     ) as mock_batch, patch(
-        "parser.entrypoints.sftp_push.process_cml_file"
-    ) as mock_single, patch(
+        "parser.entrypoints.sftp_push.process_metadata_files_batch"
+    ) as mock_meta, patch(
         "parser.entrypoints.sftp_push.Config.INCOMING_DIR", tmp_path
     ):
         process_existing_files(mock_db_writer, mock_file_manager, logger)
 
-    # Check positional args; the branch now also passes parser= as a kwarg
-    call_args = mock_single.call_args
-    assert call_args[0] == (meta, mock_db_writer, mock_file_manager, logger)
+    # Check positional args; the branch also passes parser= as a kwarg
+    call_args = mock_meta.call_args
+    assert call_args[0] == ([meta], mock_db_writer, mock_file_manager, logger)
     mock_batch.assert_called_once()
     passed_files = mock_batch.call_args[0][0]
     assert set(passed_files) == {data1, data2}
@@ -122,14 +205,17 @@ def test_mixed_files_routes_to_correct_handlers(
 def test_metadata_exception_is_swallowed(
     tmp_path, mock_db_writer, mock_file_manager, logger
 ):
-    """An exception from process_cml_file does not abort processing of remaining files."""
-    meta = _write_csv(tmp_path, "metadata_links.csv")
+    """A failed metadata write does not abort processing of remaining files."""
+    meta = tmp_path / "metadata_links.csv"
+    meta.write_text(
+        "cml_id,sublink_id,site_0_lon,site_0_lat,site_1_lon,site_1_lat,"
+        "frequency,polarization,length\n"
+        "10001,sublink_1,13.4,52.5,13.5,52.6,18.0,H,2.1\n"
+    )
     data = _write_csv(tmp_path, "raw_data_001.csv")
+    mock_db_writer.write_metadata.side_effect = Exception("DB down")
 
     with patch(
-        "parser.entrypoints.sftp_push.process_cml_file",
-        side_effect=Exception("DB down"),
-    ) as mock_single, patch(
         "parser.entrypoints.sftp_push.process_rawdata_files_batch"
     ) as mock_batch, patch(
         "parser.entrypoints.sftp_push.Config.INCOMING_DIR", tmp_path
@@ -138,7 +224,8 @@ def test_metadata_exception_is_swallowed(
             mock_db_writer, mock_file_manager, logger
         )  # must not raise
 
-    mock_single.assert_called_once()
+    mock_db_writer.write_metadata.assert_called_once()
+    assert meta.exists()
     # Batch processing of data files still happens
     mock_batch.assert_called_once()
 
@@ -299,3 +386,84 @@ def test_stats_loop_creates_dbwriter_with_config_user_id(tmp_path):
         assert (
             user_id == "ctu_cz_tmobile"
         ), f"DBWriter called without user_id=Config.USER_ID: {c}"
+
+
+def test_data_files_are_ordered_by_mtime(
+    tmp_path, mock_db_writer, mock_file_manager, logger
+):
+    newer = _write_csv(tmp_path, "raw_data_a.csv")
+    older = _write_csv(tmp_path, "raw_data_b.csv")
+    os.utime(newer, (2_000, 2_000))
+    os.utime(older, (1_000, 1_000))
+
+    with patch(
+        "parser.entrypoints.sftp_push.process_rawdata_files_batch"
+    ) as mock_batch, patch(
+        "parser.entrypoints.sftp_push.Config.INCOMING_DIR", tmp_path
+    ):
+        process_existing_files(mock_db_writer, mock_file_manager, logger)
+
+    assert mock_batch.call_args[0][0] == [older, newer]
+
+
+def test_data_batches_run_in_parallel_with_own_writers(
+    tmp_path, mock_db_writer, mock_file_manager, logger
+):
+    """Each worker thread writes through its own DBWriter, closed afterwards."""
+    files = [_write_csv(tmp_path, f"raw_data_{i}.csv") for i in range(4)]
+    created = []
+
+    def factory():
+        created.append(MagicMock())
+        return created[-1]
+
+    with patch(
+        "parser.entrypoints.sftp_push.process_rawdata_files_batch"
+    ) as mock_batch, patch(
+        "parser.entrypoints.sftp_push.Config.INCOMING_DIR", tmp_path
+    ):
+        process_existing_files(
+            mock_db_writer,
+            mock_file_manager,
+            logger,
+            writer_factory=factory,
+            max_workers=2,
+            batch_size=1,
+        )
+
+    assert mock_batch.call_count == 4
+    assert {f for c in mock_batch.call_args_list for f in c[0][0]} == set(files)
+    assert all(c[0][1] in created for c in mock_batch.call_args_list)
+    assert 1 <= len(created) <= 2
+    assert all(w.close.called for w in created)
+
+
+def test_next_batch_stops_at_max_files():
+    q = queue.Queue()
+    for i in range(5):
+        q.put(i)
+
+    assert _next_batch(q, max_files=3, max_wait=1.0) == [0, 1, 2]
+    assert _next_batch(q, max_files=3, max_wait=0.01) == [3, 4]
+
+
+def test_next_batch_empty_queue_returns_empty_list():
+    with patch("parser.entrypoints.sftp_push.queue.Queue.get", side_effect=queue.Empty):
+        assert _next_batch(queue.Queue(), max_files=3, max_wait=0.01) == []
+
+
+def test_pending_files_drops_repeat_events_until_done():
+    """A second event for a file still held by a worker is not queued again."""
+    q = queue.Queue()
+    pending = _PendingFiles(q)
+    path = Path("incoming/data.csv")
+
+    pending.put(path)
+    pending.put(path)
+    assert _next_batch(q, max_files=10, max_wait=0.01) == [path]
+    pending.put(path)
+    assert q.empty()
+
+    pending.done([path])
+    pending.put(path)
+    assert q.get_nowait() == path
@@ -8,7 +8,6 @@ from ..parsers.other_mno_csv.parse_raw import parse_rawdata_csv
 from ..parsers.other_mno_csv.parse_metadata import parse_metadata_csv
 from ..validate_dataframe import validate_dataframe
 
-
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -65,8 +64,26 @@ def test_rawdata_timezone_aware_timestamps(tmp_path):
         "2026-01-22 11:00:00+01:00;CML1;A;1.0;-46.0\n",
     )
     df = parse_rawdata_csv(csv)
-    # Timestamps keep their timezone info (not converted to UTC by this parser)
+    # Timestamps stay timezone-aware; the offset is applied, not dropped
     assert df["time"].dt.tz is not None
+    assert df["time"].iloc[0] == pd.Timestamp("2026-01-22 10:00:00", tz="UTC")
+
+
+def test_rawdata_empty_ids_and_bad_values(tmp_path):
+    """Empty ids become "nan" and unparsable values become NaN/NaT."""
+    csv = _write_csv(
+        tmp_path,
+        "raw.csv",
+        "timestamp;link_id;sublink;tx_power;rx_power\n"
+        "2026-01-22 10:00:00+01:00;CML1;;1.0;bad\n"
+        "not-a-time;CML1;A;1.1;-45.5\n",
+    )
+    df = parse_rawdata_csv(csv)
+    assert df["sublink_id"].tolist() == ["nan", "A"]
+    assert pd.isna(df["rsl"].iloc[0])
+    assert df["rsl"].iloc[1] == pytest.approx(-45.5)
+    assert pd.isna(df["time"].iloc[1])
+    assert df["time"].iloc[0] == pd.Timestamp("2026-01-22 09:00:00", tz="UTC")
 
 
 # ---------------------------------------------------------------------------
@@ -1,16 +1,12 @@
+import io
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import call, patch, MagicMock
 import pandas as pd
 import numpy as np
 
 
-@patch("parser.parse_netcdf_archive.psycopg2.connect")
-@patch("parser.parse_netcdf_archive.xr.open_dataset")
-@patch("parser.parse_netcdf_archive.os.path.exists")
-def test_main_clears_and_loads_data(mock_exists, mock_open_dataset, mock_connect):
-    """Test main() truncates tables and loads new archive data."""
-    from parser.parse_netcdf_archive import main
-
+def _mock_archive(mock_exists, mock_open_dataset, mock_connect):
+    """Point main() at a small mocked dataset and database; returns conn."""
     mock_exists.return_value = True
 
     # Build proper DataArray mocks for RSL and TSL.
@@ -22,14 +18,15 @@ def test_main_clears_and_loads_data(mock_exists, mock_open_dataset, mock_connect
     mock_rsl.dims = ("sublink_id", "cml_id", "time")
     mock_rsl.ndim = 3
     mock_rsl.values = rsl_values
-    mock_rsl.isel.return_value.values = rsl_values  # isel returns same-shaped slice
+    # isel().transpose() yields the (time, cml_id, sublink_id) slab
+    mock_rsl.isel.return_value.transpose.return_value.values = rsl_values.T
 
     tsl_values = np.random.rand(2, 2, 10)
     mock_tsl = MagicMock()
     mock_tsl.dims = ("sublink_id", "cml_id", "time")
     mock_tsl.ndim = 3
     mock_tsl.values = tsl_values
-    mock_tsl.isel.return_value.values = tsl_values
+    mock_tsl.isel.return_value.transpose.return_value.values = tsl_values.T
 
     # Mock minimal NetCDF dataset
     mock_ds = MagicMock()
@@ -59,11 +56,82 @@ def test_main_clears_and_loads_data(mock_exists, mock_open_dataset, mock_connect
     mock_conn.cursor.return_value = mock_cursor
     mock_connect.return_value = mock_conn
 
+    return mock_conn
+
+
+@patch("parser.parse_netcdf_archive.psycopg2.connect")
+@patch("parser.parse_netcdf_archive.xr.open_dataset")
+@patch("parser.parse_netcdf_archive.os.path.exists")
+def test_main_clears_and_loads_data(mock_exists, mock_open_dataset, mock_connect):
+    """Test main() truncates tables and loads new archive data."""
+    from parser.parse_netcdf_archive import main
+
+    mock_conn = _mock_archive(mock_exists, mock_open_dataset, mock_connect)
+    mock_cursor = mock_conn.cursor.return_value
+
     main()
 
     # Verify truncate is called (critical for demo setup)
     mock_cursor.execute.assert_any_call("TRUNCATE TABLE cml_data")
     mock_cursor.execute.assert_any_call("TRUNCATE TABLE cml_metadata")
+    options = mock_connect.call_args.kwargs["options"]
+    assert "-c synchronous_commit=off" in options
+    assert mock_connect.call_args.kwargs["keepalives"] == 1
+    # Metadata and time series both go through binary COPY
+    copy_sqls = [c[0][0] for c in mock_cursor.copy_expert.call_args_list]
+    assert copy_sqls[0].startswith("COPY cml_metadata (cml_id, sublink_id,")
+    assert all(sql.endswith("WITH (FORMAT BINARY)") for sql in copy_sqls)
+
+
+@patch("parser.parse_netcdf_archive.psycopg2.connect")
+@patch("parser.parse_netcdf_archive.xr.open_dataset")
+@patch("parser.parse_netcdf_archive.os.path.exists")
+def test_main_commits_reload_once_after_rebuilding_indexes(
+    mock_exists, mock_open_dataset, mock_connect
+):
+    """Index drop, truncate, load and rebuild commit as one transaction."""
+    from parser.parse_netcdf_archive import main
+
+    mock_conn = _mock_archive(mock_exists, mock_open_dataset, mock_connect)
+    definition = "CREATE INDEX idx_cml_data_user_id ON public.cml_data (user_id)"
+    mock_conn.cursor.return_value.fetchall.return_value = [
+        ("idx_cml_data_user_id", definition)
+    ]
+    events = MagicMock()
+    events.attach_mock(mock_conn.cursor.return_value.execute, "execute")
+    events.attach_mock(mock_conn.commit, "commit")
+
+    main()
+
+    mock_conn.commit.assert_called_once()
+    calls = events.mock_calls
+    drop = calls.index(call.execute("DROP INDEX idx_cml_data_user_id"))
+    rebuild = calls.index(call.execute(definition))
+    assert drop < rebuild < calls.index(call.commit())
+
+
+@patch("parser.parse_netcdf_archive.psycopg2.connect")
+@patch("parser.parse_netcdf_archive.xr.open_dataset")
+@patch("parser.parse_netcdf_archive.os.path.exists")
+def test_main_failed_load_rolls_back_index_drop(
+    mock_exists, mock_open_dataset, mock_connect
+):
+    """A load that dies part way never commits the dropped indexes."""
+    from parser.parse_netcdf_archive import main
+
+    mock_conn = _mock_archive(mock_exists, mock_open_dataset, mock_connect)
+    mock_conn.cursor.return_value.fetchall.return_value = [
+        ("idx_cml_data_user_id", "CREATE INDEX idx_cml_data_user_id ON cml_data")
+    ]
+
+    with patch(
+        "parser.parse_netcdf_archive.load_timeseries_from_netcdf",
+        side_effect=RuntimeError("killed"),
+    ), pytest.raises(RuntimeError):
+        main()
+
+    mock_conn.commit.assert_not_called()
+    mock_conn.rollback.assert_called_once()
 
 
 @patch("parser.parse_netcdf_archive.psycopg2.connect")
@@ -127,3 +195,205 @@ def test_main_exits_on_open_dataset_error(mock_exists, mock_open_dataset):
     mock_open_dataset.side_effect = Exception("corrupt file")
     with pytest.raises(SystemExit):
         main()
+
+
+def _small_dataset(dims=("sublink_id", "cml_id", "time")):
+    """Two CMLs x two sublinks x three timestamps with distinct values."""
+    import xarray as xr
+
+    rsl = xr.DataArray(
+        np.arange(12, dtype=float).reshape(2, 2, 3),
+        dims=("sublink_id", "cml_id", "time"),
+    ).transpose(*dims)
+    tsl = rsl + 100
+    return xr.Dataset(
+        {"rsl": rsl, "tsl": tsl},
+        coords={
+            "cml_id": [101, 102],
+            "sublink_id": ["sublink_1", "sublink_2"],
+            "time": pd.date_range("2024-01-01", periods=3, freq="10s"),
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "dims",
+    [
+        ("sublink_id", "cml_id", "time"),
+        ("cml_id", "sublink_id", "time"),
+        ("time", "sublink_id", "cml_id"),
+    ],
+)
+def test_load_timeseries_rows_are_time_cml_sublink_ordered(dims):
+    """Rows come out ordered by time, then CML, then sublink, with values intact."""
+    from parser.parse_netcdf_archive import (
+        TIMESERIES_COLUMNS,
+        load_timeseries_from_netcdf,
+    )
+
+    ds = _small_dataset(dims)
+    cursor = MagicMock()
+    cursor.copy_expert.side_effect = lambda sql, stream, size: stream.read()
+    written = []
+    # One timestamp per batch, so several batches share the COPY stream.
+    with patch("parser.parse_netcdf_archive.BATCH_SIZE", 1), patch(
+        "parser.parse_netcdf_archive.encode_columns",
+        side_effect=lambda cols: written.append(
+            pd.DataFrame(
+                {name: values for name, (values, _) in zip(TIMESERIES_COLUMNS, cols)}
+            )
+        )
+        or b"",
+    ):
+        rows = load_timeseries_from_netcdf(ds, None, ds.sublink_id.values, cursor)
+
+    df = pd.concat(written, ignore_index=True)
+    assert rows == len(df) == 12
+    assert list(df["cml_id"][:4]) == ["101", "101", "102", "102"]
+    assert list(df["sublink_id"][:4]) == ["sublink_1", "sublink_2"] * 2
+    # rsl[sublink, cml, time] = sublink * 6 + cml * 3 + time
+    assert list(df["rsl"][:4]) == [0.0, 6.0, 3.0, 9.0]
+    assert list(df["tsl"][4:8]) == [101.0, 107.0, 104.0, 110.0]
+    assert df["time"].is_monotonic_increasing
+    cursor.copy_expert.assert_called_once()
+
+
+def test_copy_columns_to_db_sends_binary_copy():
+    from parser.parse_netcdf_archive import copy_columns_to_db
+    from parser.pg_binary_copy import HEADER
+
+    cursor = MagicMock()
+    copy_columns_to_db(
+        cursor,
+        "cml_data",
+        [("cml_id", ["1"], "text"), ("rsl", np.array([-45.0]), "float4")],
+    )
+
+    sql, buf = cursor.copy_expert.call_args[0]
+    assert sql == "COPY cml_data (cml_id, rsl) FROM STDIN WITH (FORMAT BINARY)"
+    assert buf.getvalue().startswith(HEADER)
+
+
+def test_load_timeseries_streams_all_batches_through_one_copy():
+    """Batches are spliced into a single binary COPY payload."""
+    from parser.parse_netcdf_archive import load_timeseries_from_netcdf
+    from .test_pg_binary_copy import _read_tuples
+
+    ds = _small_dataset()
+    cursor = MagicMock()
+    streamed = []
+    # Small reads exercise chunk boundaries inside the stream.
+    cursor.copy_expert.side_effect = lambda sql, stream, size: streamed.extend(
+        iter(lambda: stream.read(7), b"")
+    )
+    with patch("parser.parse_netcdf_archive.BATCH_SIZE", 1):
+        load_timeseries_from_netcdf(ds, None, ds.sublink_id.values, cursor)
+
+    rows = _read_tuples(b"".join(streamed))
+    assert len(rows) == 12
+    assert [r[1] for r in rows[:4]] == [b"101", b"101", b"102", b"102"]
+
+
+def test_chunk_stream_small_reads_are_linear():
+    """Draining large chunks in 8 KB reads must not copy the remainder."""
+    import time
+
+    from parser.parse_netcdf_archive import _ChunkStream
+
+    chunks = [bytes([i]) * (16 << 20) for i in range(3)]
+    stream = _ChunkStream(iter(chunks))
+    start = time.perf_counter()
+    parts = list(iter(lambda: stream.read(8192), b""))
+    elapsed = time.perf_counter() - start
+
+    assert b"".join(parts) == b"".join(chunks)
+    assert elapsed < 5
+
+
+def test_copy_stream_to_db_reads_in_large_pieces():
+    from parser.parse_netcdf_archive import COPY_READ_SIZE, copy_stream_to_db
+
+    cursor = MagicMock()
+    copy_stream_to_db(cursor, "cml_data", ["rsl"], io.BytesIO(b""))
+
+    assert cursor.copy_expert.call_args[1] == {"size": COPY_READ_SIZE}
+
+
+def test_load_metadata_drops_all_nan_sublinks_and_flattens_per_cml():
+    from parser.parse_netcdf_archive import load_metadata_from_netcdf
+
+    ds = _small_dataset()
+    ds["rsl"][1] = np.nan  # sublink_2 has no data at all
+    ds = ds.assign_coords(
+        site_0_lon=("cml_id", [10.0, 11.0]),
+        site_0_lat=("cml_id", [50.0, 51.0]),
+        site_1_lon=("cml_id", [10.1, 11.1]),
+        site_1_lat=("cml_id", [50.1, 51.1]),
+        frequency=(("sublink_id", "cml_id"), [[20.0, 21.0], [22.0, 23.0]]),
+        polarization=(("sublink_id", "cml_id"), [["H", "V"], ["V", "H"]]),
+    )
+
+    df, valid_sublinks = load_metadata_from_netcdf(ds)
+
+    assert list(valid_sublinks) == ["sublink_1"]
+    assert list(df["cml_id"]) == ["101", "102"]
+    assert list(df["sublink_id"]) == ["sublink_1", "sublink_1"]
+    assert list(df["frequency"]) == [20.0, 21.0]
+    assert list(df["polarization"]) == ["H", "V"]
+    assert list(df["site_1_lat"]) == [50.1, 51.1]
+    assert (df["length"] > 0).all()
+    assert (df["user_id"] == "demo_openmrg").all()
+
+
+def test_batch_size_is_rounded_up_to_time_chunks():
+    from parser.parse_netcdf_archive import _chunk_aligned_batch_size
+
+    var = MagicMock()
+    var.dims = ("time", "sublink_id", "cml_id")
+    var.encoding = {"chunksizes": (720, 2, 364)}
+    assert _chunk_aligned_batch_size(var, 1000) == 1440
+
+    var.encoding = {"chunksizes": (5000, 2, 364)}
+    assert _chunk_aligned_batch_size(var, 1000) == 1000
+
+    var.encoding = {}
+    assert _chunk_aligned_batch_size(var, 1000) == 1000
+
+
+def test_drop_secondary_indexes_returns_definitions():
+    from parser.parse_netcdf_archive import drop_secondary_indexes
+
+    cursor = MagicMock()
+    definition = (
+        "CREATE INDEX idx_cml_data_user_id ON public.cml_data USING btree (user_id)"
+    )
+    cursor.fetchall.return_value = [("idx_cml_data_user_id", definition)]
+
+    assert drop_secondary_indexes(cursor, ["cml_data"]) == [definition]
+    cursor.execute.assert_called_with("DROP INDEX idx_cml_data_user_id")
+
+
+def test_recreate_indexes_raises_maintenance_work_mem():
+    from parser.parse_netcdf_archive import INDEX_BUILD_MEMORY, recreate_indexes
+
+    cursor = MagicMock()
+    recreate_indexes(cursor, ["CREATE INDEX a ON cml_data (user_id)"])
+
+    assert cursor.execute.call_args_list == [
+        call("SET LOCAL maintenance_work_mem = %s", (INDEX_BUILD_MEMORY,)),
+        call("CREATE INDEX a ON cml_data (user_id)"),
+    ]
+
+
+def test_connect_kwargs_prefers_local_unix_socket():
+    from parser import parse_netcdf_archive
+
+    with patch.object(parse_netcdf_archive, "DB_HOST", "localhost"), patch(
+        "parser.parse_netcdf_archive.os.path.exists", return_value=True
+    ):
+        assert parse_netcdf_archive.connect_kwargs()["host"] == "/var/run/postgresql"
+
+    with patch.object(parse_netcdf_archive, "DB_HOST", "database"), patch(
+        "parser.parse_netcdf_archive.os.path.exists", return_value=True
+    ):
+        assert parse_netcdf_archive.connect_kwargs()["host"] == "database"
@@ -0,0 +1,130 @@
+"""Tests for the binary COPY encoder."""
+
+import struct
+import pandas as pd
+import pytest
+
+from ..pg_binary_copy import HEADER, TRAILER, encode_dataframe
+
+
+def _read_tuples(payload):
+    """Minimal decoder returning raw field bytes (None for NULL) per tuple."""
+    assert payload.startswith(HEADER)
+    assert payload.endswith(TRAILER)
+    pos = len(HEADER)
+    rows = []
+    while True:
+        (count,) = struct.unpack_from("!h", payload, pos)
+        pos += 2
+        if count == -1:
+            break
+        fields = []
+        for _ in range(count):
+            (length,) = struct.unpack_from("!i", payload, pos)
+            pos += 4
+            if length == -1:
+                fields.append(None)
+            else:
+                fields.append(payload[pos : pos + length])
+                pos += length
+        rows.append(fields)
+    assert pos == len(payload)
+    return rows
+
+
+def test_encode_rawdata_row():
+    df = pd.DataFrame(
+        {
+            "time": pd.to_datetime(["2000-01-01 00:00:01"]),
+            "cml_id": ["123"],
+            "sublink_id": [None],
+            "rsl": [-45.5],
+            "tsl": [float("nan")],
+        }
+    )
+    types = {
+        "time": "timestamptz",
+        "cml_id": "text",
+        "sublink_id": "text",
+        "rsl": "float4",
+        "tsl": "float4",
+    }
+
+    rows = _read_tuples(encode_dataframe(df, types))
+
+    assert rows == [
+        [
+            struct.pack("!q", 1_000_000),
+            b"123",
+            None,
+            struct.pack("!f", -45.5),
+            None,
+        ]
+    ]
+
+
+def test_encode_tz_aware_time_is_converted_to_utc():
+    df = pd.DataFrame(
+        {"time": pd.to_datetime(["2000-01-01 01:00:00+01:00"]), "v": [1.0]}
+    )
+
+    rows = _read_tuples(encode_dataframe(df, {"time": "timestamptz", "v": "float8"}))
+
+    assert rows == [[struct.pack("!q", 0), struct.pack("!d", 1.0)]]
+
+
+def test_encode_unsupported_type_raises():
+    df = pd.DataFrame({"n": [1]})
+    with pytest.raises(ValueError, match="Unsupported"):
+        encode_dataframe(df, {"n": "int4"})
+
+
+def test_encode_multiple_rows_with_repeated_ids_and_nulls():
+    df = pd.DataFrame(
+        {
+            "time": pd.to_datetime(
+                ["2000-01-01 00:00:00", None, "2000-01-01 00:00:02"]
+            ),
+            "cml_id": ["a", "bb", "a"],
+            "rsl": [1.0, float("nan"), 2.0],
+        }
+    )
+    types = {"time": "timestamptz", "cml_id": "text", "rsl": "float8"}
+
+    rows = _read_tuples(encode_dataframe(df, types))
+
+    assert rows == [
+        [struct.pack("!q", 0), b"a", struct.pack("!d", 1.0)],
+        [None, b"bb", None],
+        [struct.pack("!q", 2_000_000), b"a", struct.pack("!d", 2.0)],
+    ]
+
+
+def test_encode_categorical_text_matches_plain_values():
+    from ..pg_binary_copy import encode_columns
+
+    values = ["b", None, "a", "b"]
+    categorical = pd.Categorical(values, categories=["a", "b"])
+
+    assert encode_columns([(categorical, "text")]) == encode_columns([(values, "text")])
+
+
+def test_encode_datetime64_array_matches_series():
+    from ..pg_binary_copy import encode_columns
+
+    times = pd.to_datetime(["2000-01-01 00:00:01", None]).values
+
+    assert encode_columns([(times, "timestamptz")]) == encode_columns(
+        [(pd.Series(times), "timestamptz")]
+    )
+
+
+def test_encode_float4_accepts_float32_and_float64():
+    import numpy as np
+
+    from ..pg_binary_copy import encode_columns
+
+    values = [-45.5, float("nan"), 1.25]
+    assert encode_columns([(np.array(values, dtype=np.float32), "float4")]) == (
+        encode_columns([(np.array(values), "float4")])
+    )
@@ -1,4 +1,4 @@
-"""Tests for process_rawdata_files_batch in service_logic."""
+"""Tests for the batch and single-file processing helpers in service_logic."""
 
 import logging
 import pandas as pd
@@ -6,7 +6,12 @@ import pytest
 from pathlib import Path
 from unittest.mock import MagicMock, call, patch
 
-from ..service_logic import process_rawdata_files_batch, process_cml_file
+from ..service_logic import (
+    process_cml_file,
+    process_files_batch,
+    process_metadata_files_batch,
+    process_rawdata_files_batch,
+)
 
 
 @pytest.fixture
@@ -64,6 +69,21 @@ def test_multiple_batches(tmp_path, mock_db_writer, mock_file_manager):
     assert mock_file_manager.archive_file.call_count == 5
 
 
+def test_batch_is_written_early_at_max_rows(
+    tmp_path, mock_db_writer, mock_file_manager
+):
+    """A batch holding max_batch_rows rows is written before it grows further."""
+    files = [_make_raw_csv(tmp_path, f"raw_{i}.csv") for i in range(3)]
+
+    process_rawdata_files_batch(
+        files, mock_db_writer, mock_file_manager, max_batch_rows=3
+    )
+
+    written = [c[0][0] for c in mock_db_writer.write_rawdata.call_args_list]
+    assert [len(df) for df in written] == [4, 2]
+    assert mock_file_manager.archive_file.call_args_list == [call(f) for f in files]
+
+
 def test_empty_file_list_is_noop(mock_db_writer, mock_file_manager):
     """An empty file list should not touch the DB or file manager."""
     process_rawdata_files_batch([], mock_db_writer, mock_file_manager)
@@ -74,6 +94,56 @@ def test_empty_file_list_is_noop(mock_db_writer, mock_file_manager):
     mock_file_manager.quarantine_file.assert_not_called()
 
 
+def test_batch_parses_on_process_pool(tmp_path, mock_db_writer, mock_file_manager):
+    """Files parse in worker processes; failures there still quarantine."""
+    from concurrent.futures import ProcessPoolExecutor
+
+    files = [_make_raw_csv(tmp_path, f"raw_{i}.csv") for i in range(3)]
+    bad = tmp_path / "bad.csv"
+    bad.write_text("not,a,valid,csv\n???\n")
+
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        process_rawdata_files_batch(
+            files + [bad],
+            mock_db_writer,
+            mock_file_manager,
+            parse_executor=executor,
+        )
+
+    combined = mock_db_writer.write_rawdata.call_args[0][0]
+    assert list(combined["cml_id"]) == ["CML_0", "CML_1"] * 3
+    assert mock_file_manager.archive_file.call_args_list == [call(f) for f in files]
+    mock_file_manager.quarantine_file.assert_called_once_with(
+        bad, "Parse error during batch processing"
+    )
+
+
+def test_parse_ahead_bounds_outstanding_parses():
+    """No more than `window` parses run ahead of the consumer."""
+    from concurrent.futures import Future
+
+    from ..service_logic import _parse_ahead
+
+    class InlineExecutor:
+        def __init__(self):
+            self.submitted = 0
+
+        def submit(self, fn, *args):
+            self.submitted += 1
+            future = Future()
+            future.set_result(fn(*args))
+            return future
+
+    executor = InlineExecutor()
+    results, ahead = [], []
+    for get in _parse_ahead(executor, lambda p: p * 10, list(range(20)), 4):
+        ahead.append(executor.submitted - len(results))
+        results.append(get())
+
+    assert results == [p * 10 for p in range(20)]
+    assert max(ahead) == 4
+
+
 # ---------------------------------------------------------------------------
 # Parse failures
 # ---------------------------------------------------------------------------
@@ -226,6 +296,86 @@ def test_process_cml_file_metadata_archived(
     )
 
 
+# ---------------------------------------------------------------------------
+# process_metadata_files_batch
+# ---------------------------------------------------------------------------
+
+
+def test_metadata_batch_writes_once_and_archives_all(
+    tmp_path, mock_db_writer, mock_file_manager
+):
+    """Several metadata files are combined into one write_metadata call."""
+    files = [_make_metadata_csv(tmp_path, f"cml_metadata_{i}.csv") for i in range(3)]
+
+    process_metadata_files_batch(files, mock_db_writer, mock_file_manager)
+
+    mock_db_writer.write_metadata.assert_called_once()
+    assert len(mock_db_writer.write_metadata.call_args[0][0]) == 3
+    assert mock_file_manager.archive_file.call_count == 3
+
+
+def test_metadata_batch_quarantines_unparseable_file(
+    tmp_path, mock_db_writer, mock_file_manager
+):
+    good = _make_metadata_csv(tmp_path, "cml_metadata_good.csv")
+    bad = tmp_path / "cml_metadata_bad.csv"
+    bad.write_text("not,a,metadata\nfile,at,all\n")
+
+    process_metadata_files_batch([good, bad], mock_db_writer, mock_file_manager)
+
+    mock_file_manager.quarantine_file.assert_called_once_with(
+        bad, "Parse error during batch processing"
+    )
+    mock_file_manager.archive_file.assert_called_once_with(good)
+
+
+def test_metadata_batch_write_failure_leaves_files_in_place(
+    tmp_path, mock_db_writer, mock_file_manager
+):
+    files = [_make_metadata_csv(tmp_path, f"cml_metadata_{i}.csv") for i in range(2)]
+    mock_db_writer.write_metadata.side_effect = Exception("DB down")
+
+    process_metadata_files_batch(files, mock_db_writer, mock_file_manager)
+
+    mock_file_manager.archive_file.assert_not_called()
+    mock_file_manager.quarantine_file.assert_not_called()
+
+
+# ---------------------------------------------------------------------------
+# process_files_batch
+# ---------------------------------------------------------------------------
+
+
+def test_files_batch_routes_metadata_and_rawdata(
+    tmp_path, mock_db_writer, mock_file_manager
+):
+    """Metadata and rawdata are each written once; vanished files are skipped."""
+    meta = _make_metadata_csv(tmp_path)
+    raws = [_make_raw_csv(tmp_path, f"raw_{i}.csv") for i in range(2)]
+    gone = tmp_path / "raw_gone.csv"
+    mock_db_writer.validate_rawdata_references.return_value = (True, [])
+
+    process_files_batch([meta, *raws, raws[0], gone], mock_db_writer, mock_file_manager)
+
+    mock_db_writer.write_metadata.assert_called_once()
+    mock_db_writer.write_rawdata.assert_called_once()
+    assert len(mock_db_writer.write_rawdata.call_args[0][0]) == 4
+    assert mock_file_manager.archive_file.call_count == 3
+
+
+def test_files_batch_falls_back_to_single_files_on_write_failure(
+    tmp_path, mock_db_writer, mock_file_manager
+):
+    raws = [_make_raw_csv(tmp_path, f"raw_{i}.csv") for i in range(2)]
+    mock_db_writer.validate_rawdata_references.return_value = (True, [])
+    mock_db_writer.write_rawdata.side_effect = [Exception("DB down"), 2, 2]
+
+    process_files_batch(raws, mock_db_writer, mock_file_manager)
+
+    assert mock_db_writer.write_rawdata.call_count == 3
+    assert mock_file_manager.archive_file.call_count == 2
+
+
 # ---------------------------------------------------------------------------
 # process_cml_file — rawdata path
 # ---------------------------------------------------------------------------
@@ -249,12 +399,19 @@ def test_process_cml_file_rawdata_archived(tmp_path, mock_db_writer, mock_file_m
 def test_process_cml_file_json_archived(tmp_path, mock_db_writer, mock_file_manager):
     """JSON files are parsed via parse_api_json_raw, written, and archived."""
     f = tmp_path / "mock_operator_rsl_20260101_data.json"
-    f.write_text('[{"timestamp":"2026-01-01T00:00:00Z","link_id":"10001","sublink_id":"1","value":-45.2}]')
+    f.write_text(
+        '[{"timestamp":"2026-01-01T00:00:00Z","link_id":"10001","sublink_id":"1","value":-45.2}]'
+    )
     mock_db_writer.write_rawdata.return_value = 1
 
     fake_df = pd.DataFrame(
-        {"time": ["2026-01-01T00:00:00Z"], "cml_id": ["10001"],
-         "sublink_id": ["1"], "rsl": [-45.2], "tsl": [float("nan")]}
+        {
+            "time": ["2026-01-01T00:00:00Z"],
+            "cml_id": ["10001"],
+            "sublink_id": ["1"],
+            "rsl": [-45.2],
+            "tsl": [float("nan")],
+        }
     )
     with patch("parser.service_logic.parse_api_json_raw", return_value=fake_df):
         result = process_cml_file(f, mock_db_writer, mock_file_manager)
@@ -313,3 +470,13 @@ def test_process_cml_file_write_failure_quarantines(
     assert "write error" in mock_db_writer.log_file_event.call_args.kwargs.get(
         "error_message", ""
     )
+
+
+def test_classify_file():
+    from ..service_logic import _make_default_bundle, classify_file
+
+    parser = _make_default_bundle()
+    assert classify_file(Path("cml_metadata_1.csv"), parser) == "metadata"
+    assert classify_file(Path("CML_DATA_1.csv"), parser) == "rawdata"
+    assert classify_file(Path("cml_meta_1.JSON"), parser) == "json"
+    assert classify_file(Path("notes.txt"), parser) is None
@@ -1,21 +1,13 @@
 """Validation utilities for parsed DataFrames."""
 
+import numpy as np
 import pandas as pd
-from typing import Literal
+from typing import List, Literal
 
-
-def validate_dataframe(df: pd.DataFrame, kind: Literal["rawdata", "metadata"]) -> bool:
-    if df is None or df.empty:
-        return False
-    if kind == "rawdata":
-        required = ["time", "cml_id", "sublink_id", "tsl", "rsl"]
-        for col in required:
-            if col not in df.columns:
-                return False
-        if df["time"].isna().any():
-            return False
-    elif kind == "metadata":
-        required = [
+_REQUIRED_COLUMNS = {
+    "rawdata": frozenset({"time", "cml_id", "sublink_id", "tsl", "rsl"}),
+    "metadata": frozenset(
+        {
             "cml_id",
             "sublink_id",
             "site_0_lon",
@@ -25,31 +17,31 @@ def validate_dataframe(df: pd.DataFrame, kind: Literal["rawdata", "metadata"]) -
             "frequency",
             "polarization",
             "length",
-        ]
-        for col in required:
-            if col not in df.columns:
-                return False
-        # Check coordinate ranges
-        if (
-            df["site_0_lon"].notna().any()
-            and not df["site_0_lon"].between(-180, 180).all()
-        ):
-            return False
-        if (
-            df["site_1_lon"].notna().any()
-            and not df["site_1_lon"].between(-180, 180).all()
-        ):
+        }
+    ),
+}
+
+
+def _coords_in_range(df: pd.DataFrame, columns: List[str], limit: float) -> bool:
+    """True if each column is entirely NaN or entirely within +-limit."""
+    values = df[columns].to_numpy(dtype=float)
+    in_range = (values >= -limit) & (values <= limit)
+    return bool((in_range.all(axis=0) | np.isnan(values).all(axis=0)).all())
+
+
+def validate_dataframe(df: pd.DataFrame, kind: Literal["rawdata", "metadata"]) -> bool:
+    if df is None or df.empty:
+        return False
+    required = _REQUIRED_COLUMNS.get(kind)
+    if required is None or not required.issubset(df.columns):
+        return False
+    if kind == "rawdata":
+        if df["time"].isna().any():
             return False
-        if (
-            df["site_0_lat"].notna().any()
-            and not df["site_0_lat"].between(-90, 90).all()
-        ):
+    else:
+        # Check coordinate ranges
+        if not _coords_in_range(df, ["site_0_lon", "site_1_lon"], 180):
             return False
-        if (
-            df["site_1_lat"].notna().any()
-            and not df["site_1_lat"].between(-90, 90).all()
-        ):
+        if not _coords_in_range(df, ["site_0_lat", "site_1_lat"], 90):
             return False
-    else:
-        return False
     return True
@@ -15,6 +15,7 @@ Run with: docker compose run --rm integration_tests
 Or locally: pytest tests/integration/test_e2e_sftp_pipeline.py -v -m integration
 """
 
+import functools
 import os
 import time
 import tempfile
@@ -44,6 +45,9 @@ DB_USER = os.getenv("DB_USER", "myuser")
 DB_PASSWORD = os.getenv("DB_PASSWORD", "mypassword")
 
 
+# Service state is checked once per test session; each check spawns a
+# docker subprocess.
+@functools.lru_cache(maxsize=None)
 def check_docker_running():
     """Check if Docker is running."""
     if RUNNING_IN_DOCKER:
@@ -61,6 +65,7 @@ def check_docker_running():
         return False
 
 
+@functools.lru_cache(maxsize=None)
 def check_service_running(service_name):
     """Check if a Docker Compose service is running."""
     if RUNNING_IN_DOCKER:
@@ -86,6 +91,32 @@ def check_ssh_keys_exist():
     return key_path.exists() and known_hosts.exists()
 
 
+def wait_for_pipeline_rows(cursor, max_wait=90, max_interval=5):
+    """Poll until both cml_data and cml_metadata contain rows.
+
+    The delay between checks starts at 0.25s and doubles up to
+    *max_interval*, so data that is already there is seen almost at once
+    while a long wait still costs only a few queries.
+
+    Returns (data_count, metadata_count, elapsed_seconds).
+    """
+    start = time.monotonic()
+    interval = 0.25
+    while True:
+        cursor.execute("SELECT COUNT(*) FROM cml_data")
+        data_count = cursor.fetchone()[0]
+
+        cursor.execute("SELECT COUNT(*) FROM cml_metadata")
+        metadata_count = cursor.fetchone()[0]
+
+        elapsed = time.monotonic() - start
+        if (data_count > 0 and metadata_count > 0) or elapsed >= max_wait:
+            return data_count, metadata_count, elapsed
+
+        time.sleep(min(interval, max_wait - elapsed))
+        interval = min(interval * 2, max_interval)
+
+
 @pytest.fixture(scope="module")
 def docker_environment():
     """Ensure Docker and required services are running."""
@@ -107,23 +138,29 @@ def docker_environment():
     # Cleanup handled by Docker Compose
 
 
-@pytest.fixture
-def sftp_client(docker_environment):
-    """Create an SFTP client connected to the server."""
-    # Resolve paths
+@pytest.fixture(scope="module")
+def private_key(docker_environment):
+    """Load the SSH private key once for every connection in the module."""
     ssh_key_path = Path(SSH_KEY_PATH).resolve()
 
     if not ssh_key_path.exists():
         pytest.skip(f"SSH key not found at {ssh_key_path}")
 
+    return paramiko.RSAKey.from_private_key_file(str(ssh_key_path))
+
+
+@pytest.fixture(scope="module")
+def sftp_client(private_key):
+    """Create an SFTP client connected to the server.
+
+    Module-scoped so the SSH handshake happens once; tests must chdir to
+    the directory they use and remove the files they create.
+    """
     # Create SSH client
     ssh = paramiko.SSHClient()
     ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
     try:
-        # Load private key
-        private_key = paramiko.RSAKey.from_private_key_file(str(ssh_key_path))
-
         # Connect
         ssh.connect(
             hostname=SFTP_HOST,
@@ -165,16 +202,12 @@ def db_connection(docker_environment):
 
 
 @pytest.mark.integration
-def test_sftp_server_accessible(docker_environment):
+def test_sftp_server_accessible(private_key):
     """Test 1: Verify SFTP server is accessible and accepting connections."""
-    ssh_key_path = Path(SSH_KEY_PATH).resolve()
-
     ssh = paramiko.SSHClient()
     ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
 
     try:
-        private_key = paramiko.RSAKey.from_private_key_file(str(ssh_key_path))
-
         ssh.connect(
             hostname=SFTP_HOST,
             port=SFTP_PORT,
@@ -201,7 +234,9 @@ def test_sftp_upload_directory_writable(sftp_client):
         sftp_client.chdir(SFTP_REMOTE_PATH)
 
         # Create a test file
-        test_filename = "test_write_permissions.txt"
+        # One probe file per xdist worker so parallel runs do not collide
+        worker = os.getenv("PYTEST_XDIST_WORKER", "main")
+        test_filename = f"test_write_permissions_{worker}.txt"
         test_content = b"test write access"
 
         with sftp_client.open(test_filename, "wb") as f:
@@ -245,31 +280,9 @@ def test_mno_simulator_uploading_files(docker_environment, db_connection):
         print(
             "\nWaiting for MNO simulator to generate/upload and parser to process (up to 90 seconds)..."
         )
-        max_wait = 90
-        check_interval = 5
-        elapsed = 0
-
-        data_count = 0
-        metadata_count = 0
-
-        while elapsed < max_wait:
-            cursor.execute("SELECT COUNT(*) FROM cml_data")
-            data_count = cursor.fetchone()[0]
-
-            cursor.execute("SELECT COUNT(*) FROM cml_metadata")
-            metadata_count = cursor.fetchone()[0]
-
-            if data_count > 0 and metadata_count > 0:
-                print(f"\n   ✓ Found data after {elapsed}s")
-                break
-
-            if elapsed % 15 == 0 and elapsed > 0:
-                print(
-                    f"   Still waiting... ({elapsed}s elapsed, data={data_count}, metadata={metadata_count})"
-                )
-
-            time.sleep(check_interval)
-            elapsed += check_interval
+        data_count, metadata_count, elapsed = wait_for_pipeline_rows(cursor)
+        if data_count > 0 and metadata_count > 0:
+            print(f"\n   ✓ Found data after {elapsed:.1f}s")
 
         print(f"\n1. Database contains {data_count} data rows")
         print(f"2. Database contains {metadata_count} metadata rows")
@@ -379,26 +392,9 @@ def test_sftp_to_parser_pipeline(docker_environment, db_connection):
 
         # Wait for full pipeline to process data
         print("\nWaiting for full pipeline to process data (up to 90 seconds)...")
-        max_wait = 90
-        check_interval = 5
-        elapsed = 0
-
-        data_count = 0
-        metadata_count = 0
-
-        while elapsed < max_wait:
-            cursor.execute("SELECT COUNT(*) FROM cml_data")
-            data_count = cursor.fetchone()[0]
-
-            cursor.execute("SELECT COUNT(*) FROM cml_metadata")
-            metadata_count = cursor.fetchone()[0]
-
-            if data_count > 0 and metadata_count > 0:
-                print(f"\n   ✓ Pipeline processed data after {elapsed}s")
-                break
-
-            time.sleep(check_interval)
-            elapsed += check_interval
+        data_count, metadata_count, elapsed = wait_for_pipeline_rows(cursor)
+        if data_count > 0 and metadata_count > 0:
+            print(f"\n   ✓ Pipeline processed data after {elapsed:.1f}s")
 
         print(f"1. Database contains {data_count} data rows")
         print(f"2. Database contains {metadata_count} metadata rows")
@@ -436,7 +432,8 @@ def test_storage_backend_configuration(docker_environment):
         pytest.skip("Storage backend config test not supported inside Docker container")
 
     try:
-        # Check environment variables in webserver
+        # Read both environment variables in webserver with a single exec;
+        # an unset variable leaves its section empty
         result = subprocess.run(
             [
                 "docker",
@@ -444,16 +441,19 @@ def test_storage_backend_configuration(docker_environment):
                 "exec",
                 "-T",
                 "webserver",
-                "printenv",
-                "STORAGE_BACKEND",
+                "sh",
+                "-c",
+                "printenv STORAGE_BACKEND; echo ---; printenv STORAGE_BASE_PATH",
             ],
             capture_output=True,
             text=True,
             timeout=10,
         )
+        backend, _, base_path = result.stdout.partition("---")
+        backend = backend.strip()
+        base_path = base_path.strip()
 
-        if result.returncode == 0:
-            backend = result.stdout.strip()
+        if backend:
             print(f"\n✓ Storage backend configured: {backend}")
             assert backend in [
                 "local",
@@ -463,24 +463,7 @@ def test_storage_backend_configuration(docker_environment):
         else:
             print("\n⚠ STORAGE_BACKEND not set, using default")
 
-        # Check base path
-        result = subprocess.run(
-            [
-                "docker",
-                "compose",
-                "exec",
-                "-T",
-                "webserver",
-                "printenv",
-                "STORAGE_BASE_PATH",
-            ],
-            capture_output=True,
-            text=True,
-            timeout=10,
-        )
-
-        if result.returncode == 0:
-            base_path = result.stdout.strip()
+        if base_path:
             print(f"✓ Storage base path: {base_path}")
 
     except Exception as e:
@@ -517,35 +500,11 @@ def test_parser_writes_to_database(docker_environment, db_connection):
 
         # Step 2: Wait for parser to process files (give it some time)
         print("\n2. Waiting for parser to process files (up to 90 seconds)...")
-        max_wait = 90
-        check_interval = 5
-        elapsed = 0
-
-        metadata_count = 0
-        rawdata_count = 0
-
-        while elapsed < max_wait:
-            # Check metadata table
-            cursor.execute("SELECT COUNT(*) FROM cml_metadata")
-            metadata_count = cursor.fetchone()[0]
-
-            # Check rawdata table
-            cursor.execute("SELECT COUNT(*) FROM cml_data")
-            rawdata_count = cursor.fetchone()[0]
-
-            if metadata_count > 0 and rawdata_count > 0:
-                print(
-                    f"\n   ✓ Found {metadata_count} metadata rows and {rawdata_count} rawdata rows after {elapsed}s"
-                )
-                break
-
-            if elapsed % 15 == 0 and elapsed > 0:
-                print(
-                    f"   Still waiting... ({elapsed}s elapsed, metadata={metadata_count}, data={rawdata_count})"
-                )
-
-            time.sleep(check_interval)
-            elapsed += check_interval
+        rawdata_count, metadata_count, elapsed = wait_for_pipeline_rows(cursor)
+        if metadata_count > 0 and rawdata_count > 0:
+            print(
+                f"\n   ✓ Found {metadata_count} metadata rows and {rawdata_count} rawdata rows after {elapsed:.1f}s"
+            )
 
         # Step 3: Verify data was written
         assert metadata_count > 0, "No metadata records found in database"